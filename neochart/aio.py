@@ -0,0 +1,95 @@
+"""NeoChart. Asyncio rendering; CPU work is offloaded to an executor.
+
+The executor may be a thread or a process pool. The number of renders
+in flight is bounded by a semaphore, which gives backpressure to callers.
+Cancelling an awaiting task cancels the render if it has not yet started.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import os
+import weakref
+
+import chart as _chart
+
+
+__all__ = ["Renderer", "render_svg", "render_png", "aread"]
+
+
+def _svg(chart):
+    return repr(chart.svg())
+
+
+def _png(chart, scale):
+    outfile = io.BytesIO()
+    chart.write_png(outfile, scale=scale)
+    return outfile.getvalue()
+
+
+class Renderer:
+    """Render charts in the given executor, at most 'limit' at a time.
+    If no executor is given, the default executor of the event loop is used.
+    """
+
+    def __init__(self, executor=None, limit=None):
+        self.executor = executor
+        self.limit = limit or os.cpu_count() or 1
+        # One semaphore per event loop, since a semaphore is bound to its loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def run(self, func, *args):
+        "Run the function in the executor when a slot is free; return its result."
+        loop = asyncio.get_running_loop()
+        try:
+            semaphore = self._semaphores[loop]
+        except KeyError:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def render_svg(self, chart):
+        "Return the SVG root document of the chart as a string."
+        return await self.run(_svg, chart)
+
+    async def render_png(self, chart, scale=1.0):
+        "Return the PNG image of the chart as bytes."
+        assert scale > 0.0
+        return await self.run(_png, chart, scale)
+
+
+_default_renderer = Renderer()
+
+
+async def render_svg(chart, renderer=None):
+    "Return the SVG root document of the chart as a string."
+    return await (renderer or _default_renderer).render_svg(chart)
+
+
+async def render_png(chart, scale=1.0, renderer=None):
+    "Return the PNG image of the chart as bytes."
+    return await (renderer or _default_renderer).render_png(chart, scale=scale)
+
+
+async def aread(filepath_or_stream, renderer=None):
+    """Read and parse all YAML documents in the file given by its path,
+    or an open file object. Yields a Chart instance for each document.
+    The documents are loaded one at a time in a dedicated thread, and
+    parsed in the executor of the renderer, at most 'limit' at a time.
+    """
+    renderer = renderer or _default_renderer
+    loop = asyncio.get_running_loop()
+    dirpath = _chart.get_dirpath(filepath_or_stream)
+    documents = _chart.load_all(filepath_or_stream)
+    done = object()
+    # Stepping and closing the generator must not overlap, so both are
+    # done in the same single thread; closing waits for a pending step.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as reader:
+        try:
+            while True:
+                data = await loop.run_in_executor(reader, next, documents, done)
+                if data is done:
+                    break
+                yield await renderer.run(_chart.parse_document, data, dirpath)
+        finally:
+            await asyncio.shield(loop.run_in_executor(reader, documents.close))
@@ -0,0 +1,234 @@
+"""NeoChart. Animation of a pie chart through a sequence of data states.
+
+The slice boundary angles are computed once per state, and the frames
+between consecutive states are interpolated from them in bulk. The output
+is either a single SVG document animating the slice paths using SMIL,
+or a sequence of raster frames drawn on one reused cairo surface,
+written as an animated PNG (APNG) or a GIF.
+"""
+
+import copy
+import math
+import pathlib
+import sys
+import zlib
+
+import png
+import utils
+from chart import Color, Element, RenderContext
+
+
+__all__ = ["Animation"]
+
+
+class Animation:
+    """Animation of the pie chart through the states, each of which is
+    a sequence of slice values. All states must have the same number of
+    slices. Each transition between two states takes 'duration' seconds
+    and is interpolated in 'steps' frames.
+    """
+
+    def __init__(self, chart, states, duration=1.0, steps=10):
+        if chart.show_labels:
+            raise ValueError("cannot animate a pie chart showing labels")
+        states = [list(values) for values in states]
+        if not states:
+            raise ValueError("no states to animate")
+        if len(set(len(values) for values in states)) != 1:
+            raise ValueError("all states must have the same number of slices")
+        if len(states[0]) != len(chart.values):
+            raise ValueError("states and chart must have the same number of slices")
+        if duration <= 0.0 or steps < 1:
+            raise ValueError("duration and steps must be positive")
+        self.chart = chart
+        self.states = states
+        self.duration = duration
+        self.steps = steps
+        self.stops = [chart._stops(values) for values in states]
+
+    def __len__(self):
+        "Return the number of frames."
+        return (len(self.states) - 1) * self.steps + 1
+
+    @property
+    def delay(self):
+        "Time in seconds that each frame is shown."
+        return self.duration / self.steps
+
+    def frames(self):
+        "Yield the slice boundary angles, as DegreesArray, for each frame."
+        for first, second in zip(self.stops, self.stops[1:]):
+            delta = second - first
+            yield first
+            for step in range(1, self.steps):
+                yield first + delta * (step / self.steps)
+        yield self.stops[-1]
+
+    def svg(self, context=None):
+        """Return the SVG root element in minixml representation,
+        with an 'animate' element for the path of each slice.
+        The render context, if given, sets the number of decimals.
+        """
+        if context is None:
+            context = RenderContext()
+        chart = copy.copy(self.chart)
+        chart.style = copy.deepcopy(self.chart.style)
+        chart.values = []
+        chart.labels = chart.fills = chart.styles = None
+        root = chart.svg(context)
+        content = root.subelements[0]
+        fills = self.chart._fills()
+        paths = [[] for fill in fills]
+        for stops in self.frames():
+            for i, (d, fill) in enumerate(
+                self.chart._slice_paths(stops, fills, context.decimals)
+            ):
+                paths[i].append(d)
+        total = utils.N(self.delay * (len(self) - 1) or self.delay)
+        for (d, fill), values in zip(
+            self.chart._slice_paths(self.stops[0], fills, context.decimals), paths
+        ):
+            elem = Element("path", d=d)
+            if fill is not None:
+                elem["fill"] = fill
+            if len(values) > 1:
+                elem += Element(
+                    "animate",
+                    attributeName="d",
+                    values=";".join(values),
+                    dur=f"{total}s",
+                    repeatCount="indefinite",
+                )
+            content += elem
+        return root
+
+    def write(self, filepath_or_stream, context=None):
+        "Write the animated SVG root to a new file or the open stream."
+        if isinstance(filepath_or_stream, (str, pathlib.Path)):
+            with open(filepath_or_stream, "w") as outfile:
+                outfile.write(repr(self.svg(context)))
+        else:
+            filepath_or_stream.write(repr(self.svg(context)))
+
+    def rasters(self, scale=1.0):
+        """Yield the RGBA bytes of each frame. All frames are drawn
+        directly on one cairo surface, which is cleared between frames.
+        Requires the cairocffi and PIL packages.
+        """
+        import cairocffi
+        import PIL.Image
+
+        assert scale > 0.0
+        chart = self.chart
+        extent = chart.extent
+        size = (int(extent.x * scale), int(extent.y * scale))
+        if size[0] == 0 or size[1] == 0:
+            raise ValueError("the chart size is undefined")
+        surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, *size)
+        context = cairocffi.Context(surface)
+        context.scale(scale, scale)
+        context.translate(extent.x / 2, extent.y / 2)
+        try:
+            context.set_line_width(float(chart.style["stroke-width"]))
+        except KeyError:
+            pass
+        stroke = _rgb(chart.style.style.get("stroke", "none"))
+        background = _rgb(chart.style.style.get("fill", "black"))
+        fills = [
+            background if fill is None else _rgb(fill)
+            for d, fill in chart._slice_paths(self.stops[0], chart._fills())
+        ]
+        # Cairo stores pixels as native-endian premultiplied ARGB words.
+        # PIL has no premultiplied mode for big-endian order; edges against
+        # a transparent background are then slightly darker.
+        rawmode = "BGRa" if sys.byteorder == "little" else "ARGB"
+
+        def paint(rgb):
+            if rgb is not None:
+                context.set_source_rgb(*rgb)
+                context.fill_preserve()
+            if stroke is not None:
+                context.set_source_rgb(*stroke)
+                context.stroke()
+            context.new_path()
+
+        for stops in self.frames():
+            context.save()
+            context.set_operator(cairocffi.OPERATOR_CLEAR)
+            context.paint()
+            context.restore()
+            context.arc(0, 0, chart.radius, 0, 2 * math.pi)
+            paint(background)
+            radians = stops.radians
+            for i, rgb in enumerate(fills):
+                context.move_to(0, 0)
+                context.arc(0, 0, chart.radius, radians[i], radians[i + 1])
+                context.close_path()
+                paint(rgb)
+            surface.flush()
+            yield PIL.Image.frombuffer(
+                "RGBA", size, surface.get_data(), "raw", rawmode, 0, 1
+            ).tobytes()
+
+    def write_png(self, filepath_or_stream, scale=1.0, plays=0):
+        """Write the animation as an animated PNG (APNG) to a new file
+        or the open binary stream. The frames are compressed as they are drawn.
+        """
+        if isinstance(filepath_or_stream, (str, pathlib.Path)):
+            with open(filepath_or_stream, "wb") as outfile:
+                self.write_png(outfile, scale=scale, plays=plays)
+            return
+        outfile = filepath_or_stream
+        extent = self.chart.extent
+        width = int(extent.x * scale)
+        height = int(extent.y * scale)
+        outfile.write(png.SIGNATURE)
+        outfile.write(png.header(width, height, png.COLOR_TYPE_RGBA))
+        outfile.write(png.animation_control(len(self), plays))
+        sequence = 0
+        stride = 4 * width
+        for frame, data in enumerate(self.rasters(scale)):
+            outfile.write(png.frame_control(sequence, width, height, self.delay))
+            sequence += 1
+            compressor = zlib.compressobj()
+            output = [
+                compressor.compress(b"\x00" + data[i : i + stride])
+                for i in range(0, len(data), stride)
+            ]
+            output.append(compressor.flush())
+            output = b"".join(output)
+            if frame == 0:
+                # The first frame is also the default image.
+                outfile.write(png.chunk(b"IDAT", output))
+            else:
+                outfile.write(png.frame_data(sequence, output))
+                sequence += 1
+        outfile.write(png.chunk(b"IEND", b""))
+
+    def write_gif(self, filepath_or_stream, scale=1.0, plays=0):
+        """Write the animation as a GIF to a new file or the open binary stream.
+        Requires the PIL package.
+        """
+        import PIL.Image
+
+        extent = self.chart.extent
+        size = (int(extent.x * scale), int(extent.y * scale))
+        images = [
+            PIL.Image.frombytes("RGBA", size, data) for data in self.rasters(scale)
+        ]
+        images[0].save(
+            filepath_or_stream,
+            format="GIF",
+            save_all=True,
+            append_images=images[1:],
+            duration=round(1000 * self.delay),
+            loop=plays,
+            disposal=2,
+        )
+
+
+def _rgb(value):
+    "Return the color as a tuple of floats for cairo, or None if 'none'."
+    if value == "none":
+        return None
+    return tuple(c / 255 for c in Color(value).rgb)
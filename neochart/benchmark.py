@@ -0,0 +1,26 @@
+"Benchmark NeoChart. Load time per interchange format for a large pie chart."
+
+import io
+import random
+import timeit
+
+from common import *
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for count in (1_000, 10_000, 100_000):
+        chart = Piechart(id="benchmark")
+        for i in range(count):
+            chart += Slice(random.random(), f"slice {i}")
+        reference = chart.as_dict()
+        print(f"{count} slices")
+        for format in FORMATS:
+            buffer = io.BytesIO() if format == "binary" else io.StringIO()
+            write(chart, buffer, format=format)
+            content = buffer.getvalue()
+            buffer.seek(0)
+            assert read(buffer).as_dict() == reference
+            number = 3
+            seconds = timeit.timeit(lambda: loads(content), number=number) / number
+            print(f"  {format:<8} {len(content):>10} bytes {seconds:>10.4f} s")
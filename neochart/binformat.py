@@ -0,0 +1,119 @@
+"""NeoChart. Compact binary encoding of chart data, using only the stdlib.
+
+The data is the dictionary of basic values given by Chart.as_dict.
+Lists of numbers, and the numerical fields of lists of dictionaries
+(such as the slices of a pie chart), are stored as packed little-endian
+arrays after a JSON header describing the rest of the structure.
+
+Layout: MAGIC, header size (uint32), JSON header, arrays. Each array
+is stored as its typecode (1 byte), item count (uint32) and raw items.
+"""
+
+import array
+import json
+import struct
+import sys
+
+
+__all__ = ["MAGIC", "dump", "dumps", "load", "loads"]
+
+MAGIC = b"NCHB\x01"
+
+ARRAY_KEY = "\x00array"
+RECORDS_KEY = "\x00records"
+
+INT_MIN = -(2**63)
+INT_MAX = 2**63 - 1
+
+
+def dump(data, outfile):
+    "Write the binary encoding of the data into the open binary file object."
+    outfile.write(dumps(data))
+
+
+def dumps(data):
+    "Return the binary encoding of the data."
+    arrays = []
+    header = json.dumps(_pack(data, arrays), separators=(",", ":")).encode()
+    parts = [MAGIC, struct.pack("<I", len(header)), header]
+    for values in arrays:
+        if sys.byteorder == "big":
+            values.byteswap()
+        parts.append(struct.pack("<cI", values.typecode.encode(), len(values)))
+        parts.append(values.tobytes())
+    return b"".join(parts)
+
+
+def load(infile):
+    "Read and decode the binary encoding from the open binary file object."
+    return loads(infile.read())
+
+
+def loads(content):
+    "Decode the binary encoding."
+    if not content.startswith(MAGIC):
+        raise ValueError("not NeoChart binary data")
+    offset = len(MAGIC)
+    (size,) = struct.unpack_from("<I", content, offset)
+    offset += 4
+    header = json.loads(content[offset : offset + size])
+    offset += size
+    arrays = []
+    while offset < len(content):
+        typecode, count = struct.unpack_from("<cI", content, offset)
+        offset += struct.calcsize("<cI")
+        values = array.array(typecode.decode())
+        end = offset + count * values.itemsize
+        values.frombytes(content[offset:end])
+        if sys.byteorder == "big":
+            values.byteswap()
+        arrays.append(values)
+        offset = end
+    return _unpack(header, arrays)
+
+
+def _pack(obj, arrays):
+    "Replace numerical lists by references to packed arrays."
+    if isinstance(obj, dict):
+        return {key: _pack(value, arrays) for key, value in obj.items()}
+    if not isinstance(obj, (list, tuple)) or not obj:
+        return obj
+    if all(type(item) is int for item in obj):
+        if INT_MIN <= min(obj) and max(obj) <= INT_MAX:
+            arrays.append(array.array("q", obj))
+            return {ARRAY_KEY: len(arrays) - 1}
+    elif all(type(item) is float for item in obj):
+        arrays.append(array.array("d", obj))
+        return {ARRAY_KEY: len(arrays) - 1}
+    elif all(isinstance(item, dict) for item in obj):
+        keys = {}
+        for item in obj:
+            keys.update(dict.fromkeys(item))
+        columns = {}
+        missing = {}
+        for key in keys:
+            columns[key] = _pack([item.get(key) for item in obj], arrays)
+            absent = [i for i, item in enumerate(obj) if key not in item]
+            if absent:
+                missing[key] = absent
+        return {RECORDS_KEY: len(obj), "columns": columns, "missing": missing}
+    return [_pack(item, arrays) for item in obj]
+
+
+def _unpack(obj, arrays):
+    "Restore the structure from references to packed arrays."
+    if isinstance(obj, list):
+        return [_unpack(item, arrays) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    if ARRAY_KEY in obj:
+        return arrays[obj[ARRAY_KEY]].tolist()
+    if RECORDS_KEY in obj:
+        result = [{} for i in range(obj[RECORDS_KEY])]
+        for key, column in obj["columns"].items():
+            for item, value in zip(result, _unpack(column, arrays)):
+                item[key] = value
+            for i in obj["missing"].get(key, []):
+                del result[i][key]
+        return result
+    return {key: _unpack(value, arrays) for key, value in obj.items()}
@@ -1,43 +1,75 @@
 "NeoChart. Core classes; Chart, Style."
 
+import array
+import collections.abc
+import concurrent.futures
 import copy
+import functools
 import io
+import json
 import pathlib
+import threading
+import types
 
 import cairosvg
 import yaml
 
+import binformat
+import columns
 import constants
+import instrument
+import tiles
+import utils
+from plan import RenderPlan
 from color import Color, Palette
-from degrees import Degrees
+from degrees import Degrees, DegreesArray
 from minixml import Element
-from vector2 import Vector2
-from utils import N, Path
+from vector2 import Vector2, Vector2Array
+from utils import N, Path, RenderContext
 
 
 __all__ = [
     "Chart",
     "Style",
+    "FrozenStyle",
     "Degrees",
+    "DegreesArray",
     "Element",
     "Vector2",
+    "Vector2Array",
     "Color",
     "Palette",
     "Path",
+    "RenderContext",
+    "RenderPlan",
+    "FORMATS",
     "write",
     "read",
+    "get_format",
+    "read_all",
+    "load_all",
+    "parse_document",
+    "loads",
     "parse",
     "add_chart",
+    "render_many",
 ]
 
 _chart_lookup = {}
+_chart_lookup_lock = threading.Lock()
+
+FORMATS = ("yaml", "json", "binary")
+SUFFIX_FORMATS = {".yaml": "yaml", ".yml": "yaml", ".json": "json", ".ncb": "binary"}
 
 
 def add_chart(cls):
     "Add the chart class to the parse lookup table."
     if not issubclass(cls, Chart):
         raise ValueError
-    _chart_lookup[cls.__name__.casefold()] = cls.parse
+    global _chart_lookup
+    with _chart_lookup_lock:
+        # Replace rather than modify, so that concurrent lookups are unaffected.
+        _chart_lookup = {**_chart_lookup, cls.__name__.casefold(): cls.parse}
 
 
 def get_parse_function(name):
@@ -45,30 +77,182 @@ def get_parse_function(name):
     try:
         return _chart_lookup[name]
     except KeyError:
-        raise ValueError(f"no parse function for item '{key}' in YAML data")
+        raise ValueError(f"no parse function for item '{name}' in YAML data")
 
 
-def write(chart, outfile):
-    "Write the YAML of the chart into the open file object."
-    yaml.safe_dump(chart.as_dict(), outfile)
+def write(chart, outfile, format="yaml", sidecar=None):
+    """Write the chart in the given format into the open file object.
+    The 'binary' format requires a file object opened in binary mode.
+    If a sidecar directory is given, large numerical columns are written
+    as external column files in it; it should be the directory of the file.
+    The column files are named after the file, if it has a name.
+    """
+    if sidecar is not None and not isinstance(sidecar, columns.Sidecar):
+        try:
+            filepath = pathlib.Path(outfile.name)
+        except (AttributeError, TypeError):
+            pass
+        else:
+            sidecar = columns.Sidecar(sidecar, filepath.stem, owner=filepath.name)
+    data = chart.as_dict(sidecar=sidecar)
+    if format == "yaml":
+        yaml.safe_dump(data, outfile)
+    elif format == "json":
+        json.dump(data, outfile)
+    elif format == "binary":
+        binformat.dump(data, outfile)
+    else:
+        raise ValueError(f"unknown format '{format}'")
 
 
-def read(filepath_or_stream):
+def read(filepath_or_stream, format=None):
     """Read and parse the file given by its path, or an open file object.
+    The format is given by the file suffix, if any, else from the content.
     Returns a Chart instance.
     """
+    with instrument.stage("read") as stage:
+        if isinstance(filepath_or_stream, (str, pathlib.Path)):
+            if format is None:
+                format = get_format(filepath_or_stream)
+            with open(filepath_or_stream, "rb") as infile:
+                content = infile.read()
+        else:
+            content = filepath_or_stream.read()
+        data = loads(content, format=format)
+        data = columns.resolve(data, get_dirpath(filepath_or_stream))
+        if stage:
+            stage.bytes = len(content)
+    if not isinstance(data, dict) or len(data) != 1:
+        raise ValueError("file must contain exactly one top-level chart.")
+    return parse(*data.popitem())
+
+
+def get_dirpath(filepath_or_stream):
+    """Return the directory relative to which external column files are
+    located; that of the file, or the current directory for a stream.
+    """
+    try:
+        return pathlib.Path(filepath_or_stream).parent
+    except TypeError:
+        try:
+            return pathlib.Path(filepath_or_stream.name).parent
+        except (AttributeError, TypeError):
+            return pathlib.Path(".")
+
+
+def get_format(filepath):
+    "Return the format given by the suffix of the file path, or None if unknown."
+    return SUFFIX_FORMATS.get(pathlib.Path(filepath).suffix.casefold())
+
+
+def loads(content, format=None):
+    """Decode the content, str or bytes, in the given format into basic values.
+    If no format is given, it is detected from the content.
+    """
+    if format is None:
+        if isinstance(content, bytes) and content.startswith(binformat.MAGIC):
+            format = "binary"
+        elif content.lstrip()[:1] in ("{", b"{"):
+            try:
+                return json.loads(content)
+            except ValueError:
+                format = "yaml"
+        else:
+            format = "yaml"
+    if format == "binary":
+        return binformat.loads(content)
+    elif format == "json":
+        return json.loads(content)
+    elif format == "yaml":
+        return yaml.safe_load(content)
+    else:
+        raise ValueError(f"unknown format '{format}'")
+
+
+def read_all(filepath_or_stream):
+    """Read and parse all YAML documents in the file given by its path,
+    or an open file object. Yields a Chart instance for each document.
+    """
+    dirpath = get_dirpath(filepath_or_stream)
+    for data in load_all(filepath_or_stream):
+        yield parse_document(data, dirpath)
+
+
+def load_all(filepath_or_stream):
+    """Load all YAML documents in the file given by its path, or an open
+    file object. Yields the basic values of each document, with references
+    to external columns not yet resolved.
+    """
     if isinstance(filepath_or_stream, (str, pathlib.Path)):
         with open(filepath_or_stream) as infile:
-            data = yaml.safe_load(infile)
-    else:
-        data = yaml.safe_load(filepath_or_stream)
-    if len(data) != 1:
-        raise ValueError("YAML file must contain exactly one top-level chart.")
-    return parse(*data.popitem())
+            yield from load_all(infile)
+        return
+    documents = yaml.safe_load_all(filepath_or_stream)
+    while True:
+        # A stage per document; not for the final attempt which finds none.
+        try:
+            with instrument.stage("read"):
+                data = next(documents)
+        except StopIteration:
+            return
+        yield data
+
+
+def parse_document(data, dirpath="."):
+    """Parse the basic values of a YAML document into a Chart instance.
+    References to external columns are resolved relative to the directory.
+    """
+    if not isinstance(data, dict) or len(data) != 1:
+        raise ValueError("YAML document must contain exactly one top-level chart.")
+    return parse(*columns.resolve(data, dirpath).popitem())
 
 
 def parse(key, data):
-    return _chart_lookup[key](data)
+    with instrument.stage("parse"):
+        return _chart_lookup[key](data)
+
+
+def render_many(charts, workers=None, format="svg", scale=1.0, filepaths=None):
+    """Render the charts concurrently in a pool of the given number of threads.
+    The format is 'svg' or 'png'. Return the list of SVG texts or PNG bytes,
+    in the order of the charts. If file paths are given, write each result
+    into the corresponding file instead, and return the list of file paths.
+    Rasterization and file output release the GIL, and so run in parallel.
+    """
+    if format == "svg":
+        render = _render_svg
+    elif format == "png":
+        render = functools.partial(_render_png, scale=scale)
+    else:
+        raise ValueError(f"unknown output format '{format}'")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        if filepaths is None:
+            return list(executor.map(render, charts))
+        else:
+            return list(
+                executor.map(
+                    functools.partial(_render_write, render=render),
+                    charts,
+                    filepaths,
+                )
+            )
+
+
+def _render_svg(chart):
+    return repr(chart.svg())
+
+
+def _render_png(chart, scale=1.0):
+    outfile = io.BytesIO()
+    chart.write_png(outfile, scale=scale)
+    return outfile.getvalue()
+
+
+def _render_write(chart, filepath, render):
+    data = render(chart)
+    with open(filepath, "wb" if isinstance(data, bytes) else "w") as outfile:
+        outfile.write(data)
+    return filepath
 
 
 class Style:
@@ -105,7 +289,7 @@ class Style:
             self.style[key] = copy.deepcopy(value)
 
     def update(self, other):
-        if isinstance(other, dict):
+        if isinstance(other, collections.abc.Mapping):
             for key, value in other.items():
                 self.set(key, value)
         elif isinstance(other, Style):
@@ -130,16 +314,27 @@ class Style:
             elif isinstance(value, Palette):
                 data[key] = [str(c) for c in value.colors]
             elif isinstance(value, float):
-                result[key] = N(value)
+                # Rounded as in the SVG output, but kept a number for parsing.
+                data[key] = float(N(value))
             else:
                 data[key] = value
         return {"style": data}
 
 
+class FrozenStyle(Style):
+    """Style that cannot be modified after creation. Used for the defaults
+    shared by all instances of a chart class, which get copies of them.
+    """
+
+    def __init__(self, **styles):
+        super().__init__(**styles)
+        self.style = types.MappingProxyType(self.style)
+
+
 class Chart:
     "Abstract chart."
 
-    DEFAULT_STYLE = Style(
+    DEFAULT_STYLE = FrozenStyle(
         stroke=Color("black"),
         fill=Color("white"),
         palette=Palette("red", "green", "blue"),
@@ -148,29 +343,60 @@ class Chart:
     def __init__(self, id=None, klass=None, style=None):
         self.id = id
         self.klass = klass
-        self.style = copy.deepcopy(self.DEFAULT_STYLE)
+        self.style = Style()
+        self.style.update(self.DEFAULT_STYLE)
         if style is not None:
             self.style.update(style)
 
+    def __copy__(self):
+        """Return a shallow copy, sharing the columns. Unlike pickling,
+        memory-mapped columns are not copied into arrays.
+        """
+        result = self.__class__.__new__(self.__class__)
+        result.__dict__.update(self.__dict__)
+        return result
+
+    def __getstate__(self):
+        """Return the state for pickling and deep copying. Columns held as
+        memoryviews, such as memory-mapped external columns, cannot be
+        pickled, and are converted to arrays, or lists if of another format.
+        """
+        state = self.__dict__.copy()
+        for key, value in state.items():
+            if isinstance(value, memoryview):
+                if value.format in array.typecodes:
+                    state[key] = array.array(value.format, value)
+                else:
+                    state[key] = value.tolist()
+        return state
+
     @property
     def extent(self):
         "Extent of this chart."
         return Vector2(0, 0)
 
-    def svg(self):
-        "Return the SVG root element with content in minixml representation."
-        origin = Vector2(0, 0) - (extent := self.extent) / 2
-        result = Element(
-            "svg",
-            xmlns=constants.SVG_XMLNS,
-            width=N(extent.x),
-            height=N(extent.y),
-            viewBox=f"{N(origin.x)} {N(origin.y)} {N(extent.x)} {N(extent.y)}",
-        )
-        result += self.svg_content()
+    def svg(self, context=None):
+        """Return the SVG root element with content in minixml representation.
+        The render context, if given, sets the number of decimals.
+        """
+        if context is None:
+            context = RenderContext()
+        with instrument.stage("svg") as stage:
+            origin = Vector2(0, 0) - (extent := self.extent) / 2
+            N = context.N
+            result = Element(
+                "svg",
+                xmlns=constants.SVG_XMLNS,
+                width=N(extent.x),
+                height=N(extent.y),
+                viewBox=f"{N(origin.x)} {N(origin.y)} {N(extent.x)} {N(extent.y)}",
+            )
+            result += self.svg_content(context)
+            if stage:
+                stage.elements = sum(1 for e in result.walk())
         return result
 
-    def svg_content(self):
+    def svg_content(self, context=None):
         "Return the SVG content element in minixml representation."
         result = Element("g")
         if self.id:
@@ -179,13 +405,33 @@ class Chart:
             result["class"] = self.klass
         return result
 
-    def write(self, filepath_or_stream):
+    def render_context(self, scale=1.0, width=None, tolerance=utils.TOLERANCE):
+        """Return the render context giving at most 'tolerance' pixels
+        rounding error when output at the given scale, or width in pixels.
+        """
+        return RenderContext.for_output(
+            self.extent, scale=scale, width=width, tolerance=tolerance
+        )
+
+    def compile(self, context=None):
+        """Return a render plan for this chart. The base chart has no
+        data-dependent parts, so the plan is just the static SVG text,
+        and rendering it with data raises TypeError.
+        """
+        return RenderPlan(repr(self.svg(context)))
+
+    def write(self, filepath_or_stream, context=None):
         "Write the this chart as SVG root to a new file or the open stream."
-        if isinstance(filepath_or_stream, (str, pathlib.Path)):
-            with open(filepath_or_stream, "w") as outfile:
-                outfile.write(repr(self.svg()))
-        else:
-            filepath_or_stream.write(repr(self.svg()))
+        root = self.svg(context)
+        with instrument.stage("write") as stage:
+            text = repr(root)
+            if isinstance(filepath_or_stream, (str, pathlib.Path)):
+                with open(filepath_or_stream, "w") as outfile:
+                    outfile.write(text)
+            else:
+                filepath_or_stream.write(text)
+            if stage:
+                stage.bytes = len(text.encode())
 
     def write_content(self, filepath_or_stream):
         "Write the the SVG content of this chart to a new file or the open stream."
@@ -195,22 +441,60 @@ class Chart:
         else:
             filepath_or_stream.write(repr(self.svg_content()))
 
-    def write_png(self, filepath_or_stream, scale=1.0):
-        "Write this chart as a PNG image to a new file or the open stream."
+    def write_png(
+        self, filepath_or_stream, scale=1.0, tile=None, workers=None, context=None
+    ):
+        """Write this chart as a PNG image to a new file or the open stream.
+        If 'tile' is given, render in strips of at most tile x tile pixels
+        using the given number of worker processes; see module 'tiles'.
+        """
         assert scale > 0.0
+        if tile:
+            if isinstance(filepath_or_stream, (str, pathlib.Path)):
+                with open(filepath_or_stream, "wb") as outfile:
+                    tiles.write_png(
+                        self,
+                        outfile,
+                        scale,
+                        tile=tile,
+                        workers=workers,
+                        context=context,
+                    )
+            else:
+                tiles.write_png(
+                    self,
+                    filepath_or_stream,
+                    scale,
+                    tile=tile,
+                    workers=workers,
+                    context=context,
+                )
+            return
+        inputfile = io.StringIO(repr(self.svg(context)))
+        with instrument.stage("png") as stage:
+            data = cairosvg.svg2png(file_obj=inputfile, scale=scale)
+            if stage:
+                stage.bytes = len(data)
         if isinstance(filepath_or_stream, (str, pathlib.Path)):
             with open(filepath_or_stream, "wb") as outfile:
-                inputfile = io.StringIO(repr(self.svg()))
-                outfile.write(cairosvg.svg2png(file_obj=inputfile, scale=scale))
+                outfile.write(data)
         else:
-            inputfile = io.StringIO(repr(self.svg()))
-            filepath_or_stream.write(cairosvg.svg2png(file_obj=inputfile, scale=scale))
-
-    def as_dict(self):
-        "Return as a dictionary of basic YAML values."
-        return {self.__class__.__name__.casefold(): self.as_dict_content()}
-
-    def as_dict_content(self):
+            filepath_or_stream.write(data)
+
+    def as_dict(self, sidecar=None):
+        """Return as a dictionary of basic YAML values. If a sidecar directory
+        is given, large numerical columns are written as external column files
+        in it, and referred to by name; see module 'columns'. The files are
+        named after the id of the chart, or its class if it has none.
+        """
+        if sidecar is not None and not isinstance(sidecar, columns.Sidecar):
+            stem = self.id or self.__class__.__name__.casefold()
+            sidecar = columns.Sidecar(sidecar, stem)
+        return {
+            self.__class__.__name__.casefold(): self.as_dict_content(sidecar=sidecar)
+        }
+
+    def as_dict_content(self, sidecar=None):
         "Return the content as a dictionary of basic YAML values."
         data = {}
         if self.id:
@@ -4,25 +4,43 @@ import pathlib
 
 import click
 
+import instrument
+import report as _report
+import watch as _watch
 from common import *
 
 
 @click.group()
-def cli():
-    pass
+@click.option("--profile", is_flag=True, help="Report time and sizes per stage.")
+@click.pass_context
+def cli(ctx, profile):
+    if profile:
+        report = instrument.Report()
+        instrument.add_hook(report)
+        ctx.call_on_close(lambda: click.echo(str(report), err=True))
 
 
 @cli.command()
 @click.option("-i", "--indent", default=2, type=int)
+@click.option(
+    "--tolerance", type=float, help="Max pixel error of coordinates at scale 1."
+)
 @click.argument("infilepath", nargs=1, required=True)
 @click.argument("outfilepath", nargs=1, required=False)
-def svg(indent, infilepath, outfilepath=None):
-    "Convert NeoChart YAML to SVG file."
+def svg(indent, tolerance, infilepath, outfilepath=None):
+    "Convert NeoChart YAML, JSON or binary file to SVG file."
     chart = read(infilepath)
     if not outfilepath:
         outfilepath = pathlib.Path(infilepath).with_suffix(".svg")
+    if tolerance:
+        root = chart.svg(chart.render_context(tolerance=tolerance))
+    else:
+        root = chart.svg()
     with open(outfilepath, "w") as outfile:
-        chart.svg().write(outfile, indent=max(0, indent))
+        with instrument.stage("write") as stage:
+            root.write(outfile, indent=max(0, indent))
+            if stage:
+                stage.bytes = outfile.tell()
 
 
 def validate_scale(ctx, param, value):
@@ -33,15 +51,101 @@ def validate_scale(ctx, param, value):
 
 @cli.command()
 @click.option("-s", "--scale", default=1.0, type=float, callback=validate_scale)
+@click.option("-t", "--tile", type=int, help="Render in tiles of this many pixels.")
+@click.option("-w", "--workers", type=int, help="Number of processes for tiles.")
+@click.option("--tolerance", type=float, help="Max pixel error of coordinates.")
 @click.argument("infilepath", nargs=1, required=True)
 @click.argument("outfilepath", nargs=1, required=False)
-def png(scale, infilepath, outfilepath=None):
-    "Convert NeoChart YAML to PNG file."
+def png(scale, tile, workers, tolerance, infilepath, outfilepath=None):
+    "Convert NeoChart YAML, JSON or binary file to PNG file."
     chart = read(infilepath)
     if not outfilepath:
         outfilepath = pathlib.Path(infilepath).with_suffix(".png")
+    if tolerance:
+        context = chart.render_context(scale=scale, tolerance=tolerance)
+    else:
+        context = None
     with open(outfilepath, "wb") as outfile:
-        chart.write_png(outfilepath, scale=scale)
+        chart.write_png(
+            outfile, scale=scale, tile=tile, workers=workers, context=context
+        )
+
+
+@cli.command()
+@click.option("-f", "--format", type=click.Choice(FORMATS), default=None)
+@click.option(
+    "--sidecar", is_flag=True, help="Write numerical columns as external files."
+)
+@click.argument("infilepath", nargs=1, required=True)
+@click.argument("outfilepath", nargs=1, required=True)
+def convert(format, sidecar, infilepath, outfilepath):
+    "Convert NeoChart YAML, JSON or binary file to any of those formats."
+    chart = read(infilepath)
+    format = format or get_format(outfilepath) or "yaml"
+    if sidecar:
+        sidecar = pathlib.Path(outfilepath).parent
+    else:
+        sidecar = None
+    with open(outfilepath, "wb" if format == "binary" else "w") as outfile:
+        write(chart, outfile, format=format, sidecar=sidecar)
+
+
+@cli.command()
+@click.option("-p", "--png", is_flag=True, help="Render PNG instead of SVG.")
+@click.option("-s", "--scale", default=1.0, type=float, callback=validate_scale)
+@click.option("-i", "--indent", default=2, type=int)
+@click.option("--interval", default=1.0, type=float, help="Seconds between polls.")
+@click.option("--debounce", default=0.5, type=float, help="Seconds of quiet.")
+@click.option("--once", is_flag=True, help="Poll once, then exit.")
+@click.argument("dirpath", nargs=1, required=False, default=".")
+def watch(png, scale, indent, interval, debounce, once, dirpath):
+    "Render NeoChart files in the directory tree whenever they change."
+
+    def report(filepath, error):
+        if error:
+            click.echo(f"{filepath}: {error}", err=True)
+        else:
+            click.echo(str(filepath))
+
+    watcher = _watch.Watcher(
+        dirpath,
+        format="png" if png else "svg",
+        scale=scale,
+        indent=indent,
+        debounce=debounce,
+    )
+    if once:
+        watcher.poll(callback=report)
+    else:
+        try:
+            watcher.run(interval=interval, callback=report)
+        except KeyboardInterrupt:
+            pass
+
+
+@cli.command()
+@click.option("-o", "--output", required=True, help="PDF file to write.")
+@click.option(
+    "--page",
+    default="a4",
+    type=click.Choice(list(_report.PAGE_SIZES)),
+    help="Page size.",
+)
+@click.option("-c", "--columns", default=1, type=int, help="Charts across a page.")
+@click.option("-r", "--rows", default=1, type=int, help="Charts down a page.")
+@click.argument("infilepaths", nargs=-1, required=True)
+def report(output, page, columns, rows, infilepaths):
+    "Write the charts in NeoChart files as pages of a PDF file."
+
+    def charts():
+        for infilepath in infilepaths:
+            if (get_format(infilepath) or "yaml") == "yaml":
+                yield from read_all(infilepath)
+            else:
+                yield read(infilepath)
+
+    pages = _report.write_pdf(charts(), output, page=page, columns=columns, rows=rows)
+    click.echo(f"{pages} pages", err=True)
 
 
 if __name__ == "__main__":
@@ -65,3 +65,26 @@ class Palette:
     def cycle(self):
         "Return an eternally cycling iterator over the current colors."
         return itertools.cycle(self.colors[:])
+
+    def gradient(self, n):
+        """Return a list of n colors interpolated linearly in RGB
+        between the current colors, from the first to the last.
+        """
+        if n < 2 or len(self.colors) < 2:
+            raise ValueError("gradient requires at least two colors and two steps")
+        rgbs = [c.rgb for c in self.colors]
+        segments = len(rgbs) - 1
+        result = []
+        for i in range(n):
+            position = i * segments / (n - 1)
+            j = min(int(position), segments - 1)
+            fraction = position - j
+            result.append(
+                Color(
+                    tuple(
+                        round(a + fraction * (b - a))
+                        for a, b in zip(rgbs[j], rgbs[j + 1])
+                    )
+                )
+            )
+        return result
@@ -0,0 +1,185 @@
+"""NeoChart. External column files; numerical arrays memory-mapped on reading.
+
+Chart data may refer to a column file by a dictionary {"external": path},
+where the path is relative to the directory of the chart file. The column
+is given to the chart as a memoryview of the mapped file, so that the
+values are not loaded into Python objects.
+
+Layout: MAGIC (5 bytes), typecode (1 byte; 'd' float64 or 'q' int64),
+owner length (uint16), item count (uint64), the owner (UTF-8, padded with
+zero bytes to a multiple of 8), then the raw little-endian items.
+The owner is the name of the chart file that the column belongs to;
+a column file is not overwritten on behalf of another chart file.
+"""
+
+import array
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import threading
+
+
+__all__ = [
+    "MAGIC",
+    "SUFFIX",
+    "EXTERNAL_KEY",
+    "Sidecar",
+    "write",
+    "read",
+    "owner",
+    "resolve",
+    "references",
+]
+
+MAGIC = b"NCHC\x01"
+SUFFIX = ".ncc"
+EXTERNAL_KEY = "external"
+
+HEADER = struct.Struct("<5scHQ")
+TYPECODES = ("d", "q")
+
+
+def write(filepath, values, typecode=None, owner=None):
+    """Write the numerical values as a column file. The typecode is 'q'
+    if all values are integers, else 'd', unless given. The owner, if given,
+    is recorded in the file. An existing file is replaced, not overwritten.
+    """
+    if isinstance(values, memoryview) and values.format in TYPECODES:
+        typecode = typecode or values.format
+    elif isinstance(values, array.array) and values.typecode in TYPECODES:
+        typecode = typecode or values.typecode
+    elif typecode is None:
+        values = list(values)
+        typecode = "q" if all(isinstance(v, int) for v in values) else "d"
+    if typecode not in TYPECODES:
+        raise ValueError(f"invalid column typecode '{typecode}'")
+    if not (isinstance(values, array.array) and values.typecode == typecode):
+        values = array.array(typecode, values)
+    if sys.byteorder == "big":
+        values = array.array(typecode, values)
+        values.byteswap()
+    owner = (owner or "").encode()
+    # Write to a temporary file and replace the file by it, so that charts
+    # which have the file mapped keep the old contents; truncating a mapped
+    # file makes reading it crash the process.
+    filepath = pathlib.Path(filepath)
+    tmppath = filepath.with_name(
+        f".{filepath.name}.{os.getpid()}.{threading.get_ident()}"
+    )
+    try:
+        with open(tmppath, "wb") as outfile:
+            outfile.write(
+                HEADER.pack(MAGIC, typecode.encode(), len(owner), len(values))
+            )
+            outfile.write(owner + bytes(-len(owner) % 8))
+            outfile.write(values.tobytes())
+        os.replace(tmppath, filepath)
+    except BaseException:
+        tmppath.unlink(missing_ok=True)
+        raise
+
+
+def read(filepath):
+    """Return the values in the column file as a read-only memoryview
+    of the memory-mapped file. On big-endian machines, a byteswapped
+    copy is returned as an array.
+    """
+    with open(filepath, "rb") as infile:
+        try:
+            mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file; cannot be mapped.
+            raise ValueError(f"not a NeoChart column file: {filepath}")
+    typecode, start, count = _header(mapped, filepath)
+    end = start + 8 * count
+    if len(mapped) < end:
+        raise ValueError(f"truncated NeoChart column file: {filepath}")
+    result = memoryview(mapped)[start:end].cast(typecode)
+    if sys.byteorder == "big":
+        result = array.array(typecode, result)
+        result.byteswap()
+    return result
+
+
+def owner(filepath):
+    "Return the owner of the column file, or None if it has none."
+    with open(filepath, "rb") as infile:
+        header = infile.read(HEADER.size)
+        typecode, start, count = _header(header, filepath)
+        name = infile.read(start - HEADER.size).rstrip(b"\0").decode()
+    return name or None
+
+
+def _header(data, filepath):
+    """Return the typecode, the offset of the items and the item count
+    from the header at the start of the data.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"not a NeoChart column file: {filepath}")
+    magic, typecode, length, count = HEADER.unpack_from(data)
+    typecode = typecode.decode()
+    if magic != MAGIC or typecode not in TYPECODES:
+        raise ValueError(f"not a NeoChart column file: {filepath}")
+    return typecode, HEADER.size + length + (-length % 8), count
+
+
+def resolve(data, dirpath):
+    """Return the data with each reference {"external": path} replaced
+    by the values of the column file; a path relative to the directory.
+    """
+    if isinstance(data, dict):
+        if len(data) == 1 and isinstance(data.get(EXTERNAL_KEY), str):
+            return read(pathlib.Path(dirpath) / data[EXTERNAL_KEY])
+        return {key: resolve(value, dirpath) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [resolve(item, dirpath) for item in data]
+    else:
+        return data
+
+
+def references(data):
+    "Return the list of paths of the column files referred to in the data."
+    if isinstance(data, dict):
+        if len(data) == 1 and isinstance(data.get(EXTERNAL_KEY), str):
+            return [data[EXTERNAL_KEY]]
+        return [path for value in data.values() for path in references(value)]
+    elif isinstance(data, list):
+        return [path for item in data for path in references(item)]
+    else:
+        return []
+
+
+class Sidecar:
+    """Directory into which the columns of a chart are written as files
+    named '{stem}.{column}.ncc'. The stem must be a plain file name.
+    The owner, by default the stem, is recorded in each file; an existing
+    column file with another owner, or without one, is not overwritten.
+    """
+
+    def __init__(self, dirpath, stem, owner=None):
+        if (
+            not stem
+            or stem.startswith(".")
+            or any(c in stem for c in ("/", "\\", "\0"))
+            or pathlib.Path(stem).name != stem
+        ):
+            raise ValueError(f"invalid column file name '{stem}'")
+        self.dirpath = pathlib.Path(dirpath)
+        self.stem = stem
+        self.owner = owner or stem
+
+    def external(self, values, column, typecode=None):
+        """Write the values as the column file for the column in the directory.
+        Return the reference to it for chart data.
+        Raise ValueError if the file belongs to another chart file.
+        """
+        filename = f"{self.stem}.{column}{SUFFIX}"
+        filepath = self.dirpath / filename
+        if filepath.exists():
+            current = owner(filepath)
+            if current != self.owner:
+                raise ValueError(f"column file {filepath} belongs to another chart")
+        write(filepath, values, typecode=typecode, owner=self.owner)
+        return {EXTERNAL_KEY: filename}
@@ -2,3 +2,5 @@
 
 from chart import *
 from piechart import *
+from heatmap import *
+from sunburst import *
@@ -7,3 +7,5 @@ __version__ = ".".join([str(n) for n in VERSION])
 SVG_XMLNS = "http://www.w3.org/2000/svg"
 SVG_CONTENT_TYPE = "image/svg+xml"
 YAML_CONTENT_TYPE = "application/yaml"
+JSON_CONTENT_TYPE = "application/json"
+BINARY_CONTENT_TYPE = "application/octet-stream"
@@ -1,21 +1,32 @@
-"Angle specified in degrees. Immutable."
+"Angle specified in degrees, and array of such. Immutable."
 
 from __future__ import annotations
 
+import array
+import itertools
 import math
-import functools
 
 
-@functools.total_ordering
 class Degrees:
     "Handle angle specified in degrees, yields value in radians."
 
+    __slots__ = ("degrees",)
+
     @classmethod
     def from_radians(cls, radians: int | float) -> Degrees:
         return Degrees(180.0 * radians / math.pi)
 
     def __init__(self, degrees: int | float):
-        self._degrees = degrees
+        object.__setattr__(self, "degrees", degrees)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Degrees is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Degrees is immutable")
+
+    def __reduce__(self):
+        return (Degrees, (self.degrees,))
 
     def __add__(self, other: int | float | Degrees) -> Degrees:
         if isinstance(other, Degrees):
@@ -39,16 +50,28 @@ class Degrees:
         return Degrees(self.degrees / other)
 
     def __lt__(self, other: Degrees) -> bool:
-        return self._degrees < other._degrees
+        return self.degrees < other.degrees
+
+    def __le__(self, other: Degrees) -> bool:
+        return self.degrees <= other.degrees
+
+    def __gt__(self, other: Degrees) -> bool:
+        return self.degrees > other.degrees
+
+    def __ge__(self, other: Degrees) -> bool:
+        return self.degrees >= other.degrees
 
     def __eq__(self, other) -> bool:
         if isinstance(other, Degrees):
-            return self._degrees == other._degrees
+            return self.degrees == other.degrees
         elif isinstance(other, (int, float)):
-            return self._degrees == other
+            return self.degrees == other
         else:
             return False
 
+    def __hash__(self) -> int:
+        return hash(self.degrees)
+
     def __neg__(self) -> Degrees:
         return Degrees(-self.degrees)
 
@@ -59,10 +82,6 @@ class Degrees:
     def __repr__(self) -> str:
         return f"Degrees({self.degrees:g})"
 
-    @property
-    def degrees(self) -> float:
-        return self._degrees
-
     @property
     def radians(self) -> float:
         return float(self)
@@ -74,3 +93,101 @@ class Degrees:
         if degrees < -180.0:
             degrees += 360.0
         return Degrees(degrees)
+
+
+class DegreesArray:
+    """Sequence of angles specified in degrees, stored as an array of floats,
+    exposed as the read-only memoryview 'degrees'. Operations are done
+    in bulk, without creating a Degrees per item. Immutable.
+    """
+
+    __slots__ = ("degrees",)
+
+    @classmethod
+    def from_radians(cls, radians) -> DegreesArray:
+        return DegreesArray([180.0 * r / math.pi for r in radians])
+
+    @classmethod
+    def accumulate(cls, start: int | float | Degrees, steps) -> DegreesArray:
+        "Return the start angle followed by the running sums of the steps (degrees)."
+        if isinstance(start, Degrees):
+            start = start.degrees
+        return DegreesArray(itertools.accumulate(steps, initial=start))
+
+    def __init__(self, degrees):
+        object.__setattr__(
+            self, "degrees", memoryview(array.array("d", degrees)).toreadonly()
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DegreesArray is immutable")
+
+    def __reduce__(self):
+        return (DegreesArray, (self.degrees.tolist(),))
+
+    def __repr__(self) -> str:
+        return f"DegreesArray({self.degrees.tolist()})"
+
+    def __len__(self) -> int:
+        return len(self.degrees)
+
+    def __getitem__(self, i: int) -> Degrees:
+        return Degrees(self.degrees[i])
+
+    def __iter__(self):
+        for degrees in self.degrees:
+            yield Degrees(degrees)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DegreesArray):
+            return self.degrees == other.degrees
+        else:
+            return False
+
+    __hash__ = None
+
+    def __add__(self, other: int | float | Degrees | DegreesArray) -> DegreesArray:
+        if isinstance(other, DegreesArray):
+            if len(self) != len(other):
+                raise ValueError("arrays must have the same length")
+            return DegreesArray(
+                [d1 + d2 for d1, d2 in zip(self.degrees, other.degrees)]
+            )
+        if isinstance(other, Degrees):
+            other = other.degrees
+        return DegreesArray([d + other for d in self.degrees])
+
+    def __sub__(self, other: int | float | Degrees | DegreesArray) -> DegreesArray:
+        if isinstance(other, DegreesArray):
+            if len(self) != len(other):
+                raise ValueError("arrays must have the same length")
+            return DegreesArray(
+                [d1 - d2 for d1, d2 in zip(self.degrees, other.degrees)]
+            )
+        if isinstance(other, Degrees):
+            other = other.degrees
+        return DegreesArray([d - other for d in self.degrees])
+
+    def __mul__(self, other: int | float) -> DegreesArray:
+        return DegreesArray([other * d for d in self.degrees])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: int | float) -> DegreesArray:
+        return DegreesArray([d / other for d in self.degrees])
+
+    def __neg__(self) -> DegreesArray:
+        return DegreesArray([-d for d in self.degrees])
+
+    @property
+    def radians(self) -> array.array:
+        "Return the array of angles in radians."
+        return array.array("d", [d * math.pi / 180.0 for d in self.degrees])
+
+    def normalized(self) -> DegreesArray:
+        "Return the angles normalized to within [-180, 180]."
+        result = array.array("d", [d % 360.0 for d in self.degrees])
+        for i, degrees in enumerate(result):
+            if degrees > 180.0:
+                result[i] = degrees - 360.0
+        return DegreesArray(result)
@@ -0,0 +1,119 @@
+"""NeoChart. Text width estimation from tables of glyph advance widths.
+
+A table is measured once per font using cairo, and cached on disk.
+If cairo cannot be loaded, the advance widths of Helvetica are used.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import threading
+
+
+__all__ = ["advances", "text_width"]
+
+CHARACTERS = [chr(i) for i in range(32, 127)] + [chr(i) for i in range(160, 256)]
+MEASURE_SIZE = 100.0
+
+# Advance widths of Helvetica for ASCII 32-126, in units of 1/1000 em.
+HELVETICA = dict(
+    zip(
+        CHARACTERS[:95],
+        [
+            278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333,
+            278, 278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278,
+            584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278,
+            500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944,
+            667, 667, 611, 278, 278, 278, 469, 556, 333, 556, 556, 500, 556, 556,
+            278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500,
+            278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+        ],
+    )
+)  # fmt: skip
+
+_tables = {}
+
+
+def advances(family="sans-serif", weight="normal"):
+    """Return the table of advance widths for the font at size 1,
+    as a dictionary with characters as keys.
+    """
+    key = (family, weight)
+    try:
+        return _tables[key]
+    except KeyError:
+        pass
+    filepath = cache_dirpath() / cache_filename(family, weight)
+    try:
+        with open(filepath) as infile:
+            table = json.load(infile)
+    except (OSError, ValueError):
+        try:
+            table = measure(family, weight)
+        except (ImportError, OSError):
+            # No cairo library; not cached on disk, to measure when available.
+            table = {c: w / 1000.0 for c, w in HELVETICA.items()}
+        else:
+            try:
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first, so that readers never see
+                # a partial file.
+                tmppath = filepath.with_suffix(
+                    f".{os.getpid()}.{threading.get_ident()}"
+                )
+                with open(tmppath, "w") as outfile:
+                    json.dump(table, outfile)
+                os.replace(tmppath, filepath)
+            except OSError:
+                pass
+    _tables[key] = table
+    return table
+
+
+def measure(family, weight):
+    "Measure the advance widths of the font at size 1 using cairo."
+    import cairocffi
+
+    surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, 1, 1)
+    context = cairocffi.Context(surface)
+    context.select_font_face(
+        family,
+        cairocffi.FONT_SLANT_NORMAL,
+        (
+            cairocffi.FONT_WEIGHT_BOLD
+            if weight == "bold"
+            else cairocffi.FONT_WEIGHT_NORMAL
+        ),
+    )
+    context.set_font_size(MEASURE_SIZE)
+    return {c: context.text_extents(c)[4] / MEASURE_SIZE for c in CHARACTERS}
+
+
+def text_width(text, size, family="sans-serif", weight="normal"):
+    """Return the estimated width of the text at the given font size.
+    Characters not in the table are given the width of 'n'.
+    """
+    table = advances(family, weight)
+    default = table["n"]
+    return size * sum([table.get(c, default) for c in text])
+
+
+def cache_filename(family, weight):
+    """Return the name of the cache file for the font. The family comes from
+    chart styles, so only letters, digits, '_' and '-' are kept, and a hash
+    of the name keeps families differing in other characters apart.
+    """
+    name = f"{family}-{weight}"
+    digest = hashlib.blake2b(name.encode(), digest_size=4).hexdigest()
+    return f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)}-{digest}.json"
+
+
+def cache_dirpath():
+    "Return the path of the directory for cached font metrics."
+    try:
+        base = pathlib.Path(os.environ["XDG_CACHE_HOME"])
+    except KeyError:
+        base = pathlib.Path.home() / ".cache"
+    return base / "neochart" / "fontmetrics"
@@ -0,0 +1,172 @@
+"NeoChart heat map chart."
+
+import base64
+import itertools
+
+import png
+from chart import *
+
+
+__all__ = ["Heatmap"]
+
+
+class Heatmap(Chart):
+    """Heat map; a grid of cells colored by value.
+    Values are mapped to colors through a lookup table of 'levels' colors
+    interpolated over the palette. Adjacent cells of equal color in a row
+    are merged into runs, and all runs of a color are drawn as one path.
+    If there are more runs than 'raster_threshold', the cells are instead
+    drawn as an embedded PNG image with one pixel per cell.
+    """
+
+    DEFAULT_CELL = 10.0
+    DEFAULT_LEVELS = 64
+    DEFAULT_RASTER_THRESHOLD = 10000
+    DEFAULT_STYLE = FrozenStyle(
+        stroke="none",
+        palette=Palette("#440154", "#21918c", "#fde725"),
+    )
+
+    def __init__(
+        self,
+        id=None,
+        klass=None,
+        cell=None,
+        vmin=None,
+        vmax=None,
+        levels=None,
+        raster_threshold=None,
+        style=None,
+        values=None,
+    ):
+        super().__init__(id=id, klass=klass, style=style)
+        self.cell = cell if cell is not None else self.DEFAULT_CELL
+        self.vmin = vmin
+        self.vmax = vmax
+        self.levels = levels if levels is not None else self.DEFAULT_LEVELS
+        if not 2 <= self.levels <= 255:
+            raise ValueError("levels must be in the range 2 to 255")
+        if raster_threshold is None:
+            self.raster_threshold = self.DEFAULT_RASTER_THRESHOLD
+        else:
+            self.raster_threshold = raster_threshold
+        self.values = []
+        if values:
+            for row in values:
+                self.append(row)
+
+    def append(self, row):
+        "Append a row of values. A value of None is not drawn."
+        if self.values and len(row) != len(self.values[0]):
+            raise ValueError("all rows must have the same length")
+        self.values.append(row)
+
+    def __iadd__(self, other):
+        self.append(other)
+        return self
+
+    @property
+    def rows(self):
+        return len(self.values)
+
+    @property
+    def columns(self):
+        return len(self.values[0]) if self.values else 0
+
+    @property
+    def extent(self):
+        return Vector2(self.columns * self.cell, self.rows * self.cell)
+
+    def colormap(self):
+        "Return the lookup table of colors for the levels."
+        return self.style["palette"].gradient(self.levels)
+
+    def indexes(self):
+        """Return the rows of the color level indexes for the values.
+        The index for the value None is the number of levels.
+        """
+        finite = [v for row in self.values for v in row if v is not None] or [0]
+        vmin = min(finite) if self.vmin is None else self.vmin
+        vmax = max(finite) if self.vmax is None else self.vmax
+        top = self.levels - 1
+        factor = top / (vmax - vmin) if vmax > vmin else 0.0
+        result = []
+        for row in self.values:
+            result.append(
+                [
+                    (
+                        self.levels
+                        if v is None
+                        else min(top, max(0, round((v - vmin) * factor)))
+                    )
+                    for v in row
+                ]
+            )
+        return result
+
+    def svg_content(self, context=None):
+        "Return the SVG content element in minixml representation."
+        if context is None:
+            context = RenderContext()
+        N = context.N
+        result = super().svg_content(context)
+        self.style.setattrs(result, "stroke")
+        if not self.values:
+            return result
+        indexes = self.indexes()
+        colormap = self.colormap()
+        runs = sum([sum(1 for g in itertools.groupby(row)) for row in indexes])
+        origin = Vector2(0, 0) - self.extent / 2
+        if runs > self.raster_threshold:
+            palette = [c.rgb for c in colormap] + [(0, 0, 0)]
+            data = png.indexed(indexes, self.columns, palette, transparent=self.levels)
+            elem = Element(
+                "image",
+                x=N(origin.x),
+                y=N(origin.y),
+                width=N(self.extent.x),
+                height=N(self.extent.y),
+                preserveAspectRatio="none",
+                href="data:image/png;base64," + base64.b64encode(data).decode(),
+            )
+            elem["image-rendering"] = "pixelated"
+            result += elem
+        else:
+            paths = {}
+            height = N(self.cell)
+            for i, row in enumerate(indexes):
+                y = N(origin.y + i * self.cell)
+                column = 0
+                for index, run in itertools.groupby(row):
+                    length = len(list(run))
+                    if index != self.levels:
+                        paths.setdefault(index, []).append(
+                            f"M {N(origin.x + column * self.cell)} {y}"
+                            f" h {N(length * self.cell)} v {height}"
+                            f" h {N(-length * self.cell)} Z"
+                        )
+                    column += length
+            result["shape-rendering"] = "crispEdges"
+            for index in sorted(paths):
+                result += Element(
+                    "path", d=" ".join(paths[index]), fill=colormap[index].hex
+                )
+        return result
+
+    def as_dict_content(self, sidecar=None):
+        """Return content as a dictionary of basic YAML values.
+        The rows of values are always inline; there are no sidecar columns.
+        """
+        data = super().as_dict_content()
+        data["cell"] = self.cell
+        if self.vmin is not None:
+            data["vmin"] = self.vmin
+        if self.vmax is not None:
+            data["vmax"] = self.vmax
+        data["levels"] = self.levels
+        data["raster_threshold"] = self.raster_threshold
+        data["values"] = [list(row) for row in self.values]
+        return data
+
+
+add_chart(Heatmap)
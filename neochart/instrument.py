@@ -0,0 +1,141 @@
+"""NeoChart. Instrumentation of the rendering stages.
+
+Stages are 'read' (YAML load), 'parse' (chart construction), 'svg'
+(element tree building), 'write' (serialization), 'png' (rasterization)
+and 'pdf' (drawing a chart into a PDF report).
+Each finished stage is passed as a Stage instance to all registered hooks.
+When no hook is registered, a stage costs a single function call.
+"""
+
+import sys
+import threading
+import time
+
+
+__all__ = ["Stage", "Report", "add_hook", "remove_hook", "stage"]
+
+_hooks = ()
+_hooks_lock = threading.Lock()
+
+
+def add_hook(func):
+    "Add the callable to be called with each finished Stage instance."
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (func,)
+
+
+def remove_hook(func):
+    "Remove the callable from the hooks. Raise ValueError if not registered."
+    global _hooks
+    with _hooks_lock:
+        hooks = list(_hooks)
+        hooks.remove(func)
+        _hooks = tuple(hooks)
+
+
+def stage(name):
+    """Return a context manager measuring the named stage.
+    It is false if instrumentation is disabled, so that the caller
+    can skip computing element and byte counts.
+    """
+    if _hooks:
+        return Stage(name)
+    else:
+        return _NULL_STAGE
+
+
+class Stage:
+    "Measurements for one execution of a stage."
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.blocks = 0
+        self.elements = 0
+        self.bytes = 0
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return (
+            f"Stage({self.name!r}, seconds={self.seconds:.6f}, blocks={self.blocks},"
+            f" elements={self.elements}, bytes={self.bytes})"
+        )
+
+    def __enter__(self):
+        self._blocks = sys.getallocatedblocks()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.perf_counter() - self._start
+        self.blocks = sys.getallocatedblocks() - self._blocks
+        if exc_type is None:
+            for hook in _hooks:
+                hook(self)
+        return False
+
+    def as_dict(self):
+        "Return as a dictionary of basic values."
+        return dict(
+            name=self.name,
+            seconds=self.seconds,
+            blocks=self.blocks,
+            elements=self.elements,
+            bytes=self.bytes,
+        )
+
+
+class _NullStage:
+    "Stand-in for Stage when instrumentation is disabled."
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Report:
+    "Hook accumulating the measurements per stage name. Thread-safe."
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, stage):
+        with self.lock:
+            try:
+                total = self.totals[stage.name]
+            except KeyError:
+                total = self.totals[stage.name] = dict(
+                    count=0, seconds=0.0, blocks=0, elements=0, bytes=0
+                )
+            total["count"] += 1
+            total["seconds"] += stage.seconds
+            total["blocks"] += stage.blocks
+            total["elements"] += stage.elements
+            total["bytes"] += stage.bytes
+
+    def __str__(self):
+        lines = [
+            f"{'stage':<8} {'count':>6} {'seconds':>10} {'blocks':>10}"
+            f" {'elements':>10} {'bytes':>10}"
+        ]
+        for name, total in self.totals.items():
+            lines.append(
+                f"{name:<8} {total['count']:>6} {total['seconds']:>10.6f}"
+                f" {total['blocks']:>10} {total['elements']:>10} {total['bytes']:>10}"
+            )
+        return "\n".join(lines)
@@ -1,19 +1,26 @@
 "Minimalist XML library for reading, writing, creating and editing an element tree."
 
 import copy
+import hashlib
 import io
 import xml.sax
 import xml.sax.saxutils
 
 
 class Element:
-    "XML element. Contains a reference to superelement and subelements (if any)."
+    """XML element. Contains a reference to superelement and subelements (if any).
+    The structural digest is computed on demand and cached in each element.
+    It is cleared up the superelement chain when the element is modified through
+    its methods. Call 'invalidate' after modifying 'tag', 'attrs' or 'subelements'
+    directly.
+    """
 
     repr_indent = 2
     xml_decl = True
 
     def __init__(self, tag, **attrs):
         self.tag = tag
+        self._digest = None
         self.attrs = {}
         for name, value in attrs.items():
             self[name] = value
@@ -52,6 +59,7 @@ class Element:
         if not isinstance(value, str):
             value = str(value)
         self.attrs[key] = value
+        self.invalidate()
 
     def __delitem__(self, key):
         "Delete the attribute in this element."
@@ -59,6 +67,7 @@ class Element:
             del self.attrs[key]
         except KeyError:
             raise KeyError(f"no such attribute '{key}' in element")
+        self.invalidate()
 
     def __contains__(self, key):
         "Does this element have the given attribute?"
@@ -73,9 +82,13 @@ class Element:
         return len(self.subelements)
 
     def __eq__(self, other):
-        "Are the element and its subelements equal? Ignores the superelement."
+        """Are the element and its subelements equal? Ignores the superelement.
+        Compares the digests if they have been computed for both elements.
+        """
         if not isinstance(other, Element):
             return False
+        if self._digest is not None and other._digest is not None:
+            return self._digest == other._digest
         if self.tag != other.tag:
             return False
         if self.attrs != other.attrs:
@@ -131,6 +144,75 @@ class Element:
             elem = elem.superelement
         return result
 
+    @property
+    def digest(self):
+        """Hex digest of the tag, the attributes and the subelements, recursively.
+        Equal elements have equal digests. Ignores the superelement.
+        """
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+
+            def update(marker, *fields):
+                # Each field is length-prefixed, so that no two different
+                # sequences of fields produce the same bytes.
+                hasher.update(marker)
+                for field in fields:
+                    field = field.encode()
+                    hasher.update(len(field).to_bytes(8, "little"))
+                    hasher.update(field)
+
+            update(b"\0", self.tag)
+            for name, value in sorted(self.attrs.items()):
+                update(b"\1", name, str(value))
+            for elem in self.subelements:
+                if isinstance(elem, Element):
+                    update(b"\2", elem.digest)
+                else:
+                    update(b"\3", type(elem).__name__, str(elem))
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    @property
+    def etag(self):
+        "Return the digest as a quoted string, for use as an HTTP ETag."
+        return f'"{self.digest}"'
+
+    def invalidate(self):
+        "Clear the cached digest of this element and of its superelements."
+        elem = self
+        while elem is not None and elem._digest is not None:
+            elem._digest = None
+            elem = elem.superelement
+
+    def duplicates(self):
+        """Return the lists of identical subtrees below this element,
+        for those occurring more than once. Occurrences inside a reported
+        subtree are not counted; larger subtrees are considered first.
+        The lists are in document order of their first subtree.
+        """
+        elems = list(self.walk())[1:]
+        position = {id(elem): i for i, elem in enumerate(elems)}
+        # Height of each subtree; identical subtrees have the same height.
+        heights = {}
+        for elem in reversed(elems):
+            heights[id(elem)] = 1 + max(
+                (heights[id(e)] for e in elem.subelements if isinstance(e, Element)),
+                default=0,
+            )
+        groups = {}
+        for elem in elems:
+            groups.setdefault(elem.digest, []).append(elem)
+        covered = set()
+        result = []
+        for group in sorted(groups.values(), key=lambda g: -heights[id(g[0])]):
+            group = [elem for elem in group if id(elem) not in covered]
+            if len(group) > 1:
+                result.append(group)
+                for elem in group:
+                    covered.update(id(e) for e in elem.walk())
+        result.sort(key=lambda group: position[id(group[0])])
+        return result
+
     def insert(self, i, elem):
         "Insert the element at position i in the list of subelements of this element."
         if isinstance(elem, Element) and elem.superelement:
@@ -138,6 +220,7 @@ class Element:
         self.subelements.insert(i, elem)
         if isinstance(elem, Element):
             elem.superelement = self
+        self.invalidate()
 
     def append(self, elem):
         "Append the element last in the subelements of this element."
@@ -146,9 +229,12 @@ class Element:
         self.subelements.append(elem)
         if isinstance(elem, Element):
             elem.superelement = self
+        self.invalidate()
 
     def free(self):
         "Remove this element from its superelement, if any."
+        if self.superelement is not None:
+            self.superelement.invalidate()
         self.superelement = None
 
     def create(self, tag, **attrs):
@@ -240,10 +326,13 @@ class DefaultContentHandler(xml.sax.ContentHandler):
             self.stack[-1].subelements.append(xml.sax.saxutils.unescape(content))
 
 
-def read(filepath_or_stream, content_handler=DefaultContentHandler()):
+def read(filepath_or_stream, content_handler=None):
     """Read and parse the file given by its path, or an open file object.
+    If no content handler is given, a new DefaultContentHandler is used.
     Returns the root XML element.
     """
+    if content_handler is None:
+        content_handler = DefaultContentHandler()
     try:
         xml.sax.parse(filepath_or_stream, content_handler)
     except xml.sax.SAXException as error:
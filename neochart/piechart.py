@@ -1,24 +1,73 @@
 "NeoChart pie chart."
 
+import array
 import collections
+import copy
+import csv
+import functools
+import itertools
+from xml.sax.saxutils import quoteattr
 
+import fontmetrics
 import utils
 from chart import *
+from plan import SLOT_TAG, RenderPlan
 
 
 __all__ = ["Piechart", "Slice"]
 
 
+_quoteattr = functools.lru_cache(maxsize=1024)(quoteattr)
+
+
+def sector_paths(stops, outer, inner=0.0, decimals=utils.DECIMALS):
+    """Yield the SVG path of the sector between each consecutive pair
+    of the stops (DegreesArray), from the radius 'inner' to 'outer'.
+    With inner radius 0, the sector is a pie slice from the center.
+    """
+    # The same text as given by utils.Path, but formatting each point once.
+    if decimals == utils.DECIMALS:
+        N = utils.N
+    else:
+        N = functools.partial(utils.N, decimals=decimals)
+    degrees = stops.degrees
+    radians = stops.radians
+    points = Vector2Array.from_polar(outer, radians)
+    points = [f"{N(x)} {N(y)}" for x, y in zip(points.xs, points.ys)]
+    arc = f"A {N(outer)} {N(outer)} 0"
+    if inner:
+        inners = Vector2Array.from_polar(inner, radians)
+        inners = [f"{N(x)} {N(y)}" for x, y in zip(inners.xs, inners.ys)]
+        inner_arc = f"A {N(inner)} {N(inner)} 0"
+        for i in range(len(points) - 1):
+            lof = 1 if degrees[i + 1] - degrees[i] > 180 else 0
+            yield (
+                f"M {points[i]} {arc} {lof} 1 {points[i + 1]}"
+                f" L {inners[i + 1]} {inner_arc} {lof} 0 {inners[i]} Z"
+            )
+    else:
+        for i in range(len(points) - 1):
+            lof = 1 if degrees[i + 1] - degrees[i] > 180 else 0
+            yield f"M 0 0 L {points[i]} {arc} {lof} 1 {points[i + 1]} Z"
+
+
 Slice = collections.namedtuple(
     "Slice", ["value", "label", "style"], defaults=[None, None]
 )
 
 
 class Piechart(Chart):
-    "Pie chart."
+    """Pie chart. The slices are stored in columns; 'values', and 'labels',
+    'fills' and 'styles' which are None unless any slice has one.
+    """
 
     DEFAULT_RADIUS = 100.0
-    DEFAULT_STYLE = Style(
+    DEFAULT_FONT_SIZE = 12
+    DEFAULT_FONT_FAMILY = "sans-serif"
+    LABEL_LEADER = 10.0
+    LABEL_OFFSET = 12.0
+    LABEL_GAP = 3.0
+    DEFAULT_STYLE = FrozenStyle(
         stroke=Color("gray"),
         stroke_width=2,
         fill=Color("white"),
@@ -34,6 +83,10 @@ class Piechart(Chart):
         total=None,
         style=None,
         slices=None,
+        show_labels=False,
+        values=None,
+        labels=None,
+        fills=None,
     ):
         super().__init__(id=id, klass=klass, style=style)
         self.radius = radius if radius is not None else self.DEFAULT_RADIUS
@@ -42,27 +95,120 @@ class Piechart(Chart):
         else:
             self.start = start
         self.total = total
-        self.slices = []
-        if slices:
-            for slice in slices:
-                self.append(slice)
+        self.show_labels = show_labels
+        self.values = []
+        self.labels = None
+        self.fills = None
+        self.styles = None
+        if values is not None:
+            if slices:
+                raise ValueError("give either slices or values, not both")
+            self._set_columns(values, labels, fills)
+        elif slices:
+            self.slices = slices
+
+    @classmethod
+    def from_arrays(cls, values, labels=None, fills=None, **kwargs):
+        """Create a pie chart from columns of slice values, and optionally
+        labels and fills. Values supporting the buffer protocol, such as
+        'array' or NumPy arrays, are used through a memoryview without copying.
+        """
+        return cls(values=values, labels=labels, fills=fills, **kwargs)
+
+    def _set_columns(self, values, labels, fills):
+        "Set the columns; the values without copying, if possible."
+        if isinstance(values, (list, array.array)):
+            self.values = values
+        else:
+            try:
+                self.values = memoryview(values)
+            except TypeError:
+                self.values = list(values)
+        for name, column in [("labels", labels), ("fills", fills)]:
+            if column is not None:
+                if len(column) != len(self.values):
+                    raise ValueError(f"{name} and values must have the same length")
+                setattr(self, name, list(column))
+
+    @classmethod
+    def from_csv(cls, infile, value="value", label="label", fill="fill", **kwargs):
+        """Create a pie chart from CSV data in the open file object.
+        The first row gives the column names; columns other than those given
+        for value, label and fill are ignored.
+        """
+        reader = csv.reader(infile)
+        header = next(reader)
+        try:
+            value_index = header.index(value)
+        except ValueError:
+            raise ValueError(f"no column '{value}' in CSV data")
+        rows = list(reader)
+        columns = {}
+        for name, column in [("labels", label), ("fills", fill)]:
+            if column in header:
+                index = header.index(column)
+                columns[name] = [row[index] or None for row in rows]
+        return cls.from_arrays(
+            array.array("d", [float(row[value_index]) for row in rows]),
+            **columns,
+            **kwargs,
+        )
+
+    @property
+    def slices(self):
+        """Return the tuple of Slice instances; created from the columns.
+        Changing it does not change the chart; assign to 'slices' instead.
+        """
+        return tuple(
+            Slice(
+                value,
+                self.labels[i] if self.labels is not None else None,
+                self._slice_style(i),
+            )
+            for i, value in enumerate(self.values)
+        )
+
+    @slices.setter
+    def slices(self, slices):
+        "Replace the columns by those of the given slice specifications."
+        self.values = []
+        self.labels = self.fills = self.styles = None
+        for slice in slices:
+            self.append(slice)
+
+    def _slice_style(self, i):
+        "Return the style of the slice, if any, including its fill."
+        style = self.styles[i] if self.styles is not None else None
+        fill = self.fills[i] if self.fills is not None else None
+        if fill is not None:
+            style = Style() if style is None else copy.deepcopy(style)
+            style.set("fill", fill)
+        return style
 
     def append(self, slice):
         if isinstance(slice, Slice):
-            item = slice
+            value, label, style = slice
         elif isinstance(slice, (float, int)):
-            item = Slice(slice)
+            value, label, style = slice, None, None
         elif isinstance(slice, (tuple, list)) and len(slice) == 2:
-            item = Slice(*slice)
+            value, label, style = slice[0], slice[1], None
         elif isinstance(slice, dict) and "value" in slice:
             try:
                 style = Style(**slice["style"])
             except KeyError:
                 style = None
-            item = Slice(slice["value"], slice.get("label"), style)
+            value, label = slice["value"], slice.get("label")
         else:
             raise ValueError("invalid slice specification")
-        self.slices.append(item)
+        if not isinstance(self.values, (list, array.array)):
+            self.values = list(self.values)
+        self.values.append(value)
+        for name, item in [("labels", label), ("fills", None), ("styles", style)]:
+            column = getattr(self, name)
+            if column is not None:
+                column.append(item)
+            elif item is not None:
+                setattr(self, name, [None] * (len(self.values) - 1) + [item])
 
     def __iadd__(self, other):
         self.append(other)
@@ -70,56 +216,214 @@ class Piechart(Chart):
 
     @property
     def extent(self):
-        return Vector2(
-            2 * self.radius + self.style["stroke-width"],
-            2 * self.radius + self.style["stroke-width"],
-        )
+        if self.show_labels and len(self.values):
+            size = self._label_layout(self._stops(self.values))[1]
+        else:
+            size = Vector2(2 * self.radius, 2 * self.radius)
+        return size + Vector2(self.style["stroke-width"], self.style["stroke-width"])
 
-    def svg_content(self):
+    def svg_content(self, context=None):
         "Return the SVG content element in minixml representation."
-        result = super().svg_content()
+        if context is None:
+            context = RenderContext()
+        result = super().svg_content(context)
         self.style.setattrs(result, "stroke", "stroke-width", "fill")
-        circle = Element("circle", r=utils.N(self.radius))
+        circle = Element("circle", r=context.N(self.radius))
         result += circle
-        if self.slices:
-            try:
-                palette = self.style["palette"].cycle()
-            except KeyError:
-                palette = None
-            total = sum([s.value for s in self.slices])
-            if self.total:
-                total = max(total, self.total)
-            stop = self.start - Degrees(90) if self.start else Degrees(-90)
-            for slice in self.slices:
-                fraction = slice.value / total
-                start = stop
-                stop = start + fraction * Degrees(360)
-                path = Path(Vector2(0, 0))
-                p0 = Vector2.from_polar(self.radius, float(start))
-                p1 = Vector2.from_polar(self.radius, float(stop))
-                lof = 1 if stop - start > Degrees(180) else 0
-                path.L(p0).A(self.radius, self.radius, 0, lof, 1, p1).Z()
-                elem = Element("path", d=str(path))
+        if len(self.values):
+            stops = self._stops(self.values)
+            fills = self._fills()
+            for d, fill in self._slice_paths(stops, fills, context.decimals):
+                elem = Element("path", d=d)
+                if fill is not None:
+                    elem["fill"] = fill
+                result += elem
+            if self.show_labels:
+                result += self._labels_content(stops, context)
+        return result
+
+    def compile(self, context=None):
+        """Return a render plan for this chart, taking the slice values,
+        and optionally the slice fills, as arguments to 'render'.
+        """
+        if context is None:
+            context = RenderContext()
+        if self.show_labels:
+            raise ValueError("cannot compile a pie chart showing labels")
+        chart = copy.copy(self)
+        chart.style = copy.deepcopy(self.style)
+        chart.values = []
+        chart.labels = chart.fills = chart.styles = None
+        root = chart.svg(context)
+        root.subelements[0] += Element(SLOT_TAG)
+        return RenderPlan.from_svg(
+            root, functools.partial(chart._render_slices, decimals=context.decimals)
+        )
+
+    def _fills(self):
+        "Return the list of fills for the slices; None for those without."
+        if self.fills is None:
+            result = [None] * len(self.values)
+        else:
+            result = list(self.fills)
+        if self.styles is not None:
+            for i, style in enumerate(self.styles):
                 try:
-                    elem["fill"] = str(slice.style["fill"])
+                    result[i] = style["fill"]
                 except (TypeError, KeyError):
-                    if palette:
-                        elem["fill"] = str(next(palette))
-                result += elem
+                    pass
+        return result
+
+    def _render_slices(self, values, fills=None, decimals=utils.DECIMALS):
+        """Return the texts of the path elements for the slices.
+        Raise ValueError unless there are as many fills as values, if given.
+        """
+        if fills is None:
+            fills = [None] * len(values)
+        elif len(fills) != len(values):
+            raise ValueError("values and fills must have the same length")
+        result = []
+        stops = self._stops(values)
+        for d, fill in self._slice_paths(stops, fills, decimals):
+            if fill is None:
+                result.append(f'<path d="{d}" />')
+            else:
+                result.append(f'<path d="{d}" fill={_quoteattr(fill)} />')
+        return result
+
+    def _stops(self, values):
+        "Return the angles of the slice boundaries, starting with the start angle."
+        total = sum(values)
+        if self.total:
+            total = max(total, self.total)
+        start = self.start - Degrees(90) if self.start else Degrees(-90)
+        return DegreesArray.accumulate(start, (v / total * 360 for v in values))
+
+    def _slice_paths(self, stops, fills, decimals=utils.DECIMALS):
+        """Yield the tuples (path, fill) for the slices between the stops.
+        A fill of None is taken from the palette, if any.
+        """
+        try:
+            palette = itertools.cycle([str(c) for c in self.style["palette"].colors])
+        except KeyError:
+            palette = None
+        paths = sector_paths(stops, self.radius, decimals=decimals)
+        for d, fill in zip(paths, fills):
+            if fill is None and palette:
+                fill = next(palette)
+            yield d, None if fill is None else str(fill)
+
+    def _label_font(self):
+        "Return the font size and family for the labels."
+        try:
+            size = self.style["font-size"]
+        except KeyError:
+            size = self.DEFAULT_FONT_SIZE
+        try:
+            family = self.style["font-family"]
+        except KeyError:
+            family = self.DEFAULT_FONT_FAMILY
+        return size, family
+
+    def _label_layout(self, stops):
+        """Return the list of placed labels as tuples (label, point on the arc,
+        leader elbow point, label point, side), and the size of the pie
+        including the labels. The labels on each side are sorted by height,
+        and overlaps are removed by one sweep downwards and one upwards.
+        """
+        size, family = self._label_font()
+        height = 1.2 * size
+        leader = self.radius + self.LABEL_LEADER
+        middles = DegreesArray(
+            [(a + b) / 2 for a, b in zip(stops.degrees, stops.degrees[1:])]
+        ).radians
+        arcs = Vector2Array.from_polar(self.radius, middles)
+        elbows = Vector2Array.from_polar(leader, middles)
+        sides = {1: [], -1: []}
+        for i, label in enumerate(self.labels or []):
+            if label:
+                sides[1 if elbows.xs[i] >= 0 else -1].append((elbows.ys[i], i))
+        result = []
+        width = self.radius
+        depth = self.radius
+        for side, items in sides.items():
+            items.sort()
+            ys = [y for y, i in items]
+            for j in range(1, len(ys)):
+                ys[j] = max(ys[j], ys[j - 1] + height)
+            bottom = max(leader, (len(ys) - 1) * height / 2)
+            if ys and ys[-1] > bottom:
+                ys[-1] = bottom
+                for j in range(len(ys) - 2, -1, -1):
+                    ys[j] = min(ys[j], ys[j + 1] - height)
+            x = side * (leader + self.LABEL_OFFSET)
+            for y, (_, i) in zip(ys, items):
+                label = str(self.labels[i])
+                width = max(
+                    width,
+                    abs(x)
+                    + self.LABEL_GAP
+                    + fontmetrics.text_width(label, size, family),
+                )
+                depth = max(depth, abs(y) + height / 2)
+                result.append((label, arcs[i], elbows[i], Vector2(x, y), side))
+        return result, Vector2(2 * width, 2 * depth)
+
+    def _labels_content(self, stops, context):
+        "Return the SVG element for the labels and their leader lines."
+        size, family = self._label_font()
+        result = Element("g")
+        leaders = Element("g", fill="none")
+        leaders["stroke-width"] = 1
+        texts = Element("g", stroke="none", fill="black")
+        texts["font-size"] = context.N(size)
+        texts["font-family"] = family
+        for label, arc, elbow, point, side in self._label_layout(stops)[0]:
+            leaders += Element("path", d=str(context.Path(arc).L(elbow, point)))
+            text = Element(
+                "text",
+                x=context.N(point.x + side * self.LABEL_GAP),
+                y=context.N(point.y + 0.35 * size),
+            )
+            text["text-anchor"] = "start" if side > 0 else "end"
+            text += label
+            texts += text
+        result += leaders
+        result += texts
         return result
 
-    def as_dict_content(self):
-        "Return content as a dictionary of basic YAML values."
+    def as_dict_content(self, sidecar=None):
+        """Return content as a dictionary of basic YAML values. If a sidecar
+        (columns.Sidecar) is given, and no slice has a style other than its
+        fill, the values are written as an external column file.
+        """
         data = super().as_dict_content()
         data["radius"] = self.radius
         data["start"] = None if self.start is None else self.start.degrees
+        if self.show_labels:
+            data["show_labels"] = True
+        if sidecar is not None and self.styles is None:
+            data["values"] = sidecar.external(self.values, "values")
+            if self.labels is not None:
+                data["labels"] = list(self.labels)
+            if self.fills is not None:
+                data["fills"] = [None if f is None else str(f) for f in self.fills]
+            return data
+        values = self.values
+        if not isinstance(values, list):
+            values = values.tolist()
         data["slices"] = []
-        for slice in self.slices:
-            d = dict(value=slice.value)
-            if slice.label:
-                d["label"] = slice.label
-            if slice.style:
-                d.update(slice.style.as_dict())
+        for i, value in enumerate(values):
+            d = dict(value=value)
+            if self.labels is not None and self.labels[i]:
+                d["label"] = self.labels[i]
+            style = {}
+            if self.styles is not None and self.styles[i]:
+                style = self.styles[i].as_dict()["style"]
+            if self.fills is not None and self.fills[i] is not None:
+                style = {"fill": str(self.fills[i]), **style}
+            if style:
+                d["style"] = style
             data["slices"].append(d)
         return data
 
@@ -0,0 +1,84 @@
+"Minimal PNG encoding, using only the stdlib."
+
+import struct
+import zlib
+
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+COLOR_TYPE_RGBA = 6
+COLOR_TYPE_INDEXED = 3
+
+
+def chunk(kind, data):
+    "Return the PNG chunk of the given kind (bytes) containing the data."
+    return b"".join(
+        [
+            struct.pack(">I", len(data)),
+            kind,
+            data,
+            struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))),
+        ]
+    )
+
+
+def header(width, height, color_type, bit_depth=8):
+    "Return the IHDR chunk for a non-interlaced image."
+    return chunk(
+        b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+    )
+
+
+def animation_control(frames, plays=0):
+    "Return the acTL chunk of an APNG; 0 plays means looping forever."
+    return chunk(b"acTL", struct.pack(">II", frames, plays))
+
+
+def frame_control(sequence, width, height, delay):
+    """Return the fcTL chunk for a full-size frame shown for the delay
+    in seconds, rounded to milliseconds.
+    """
+    return chunk(
+        b"fcTL",
+        struct.pack(
+            ">IIIIIHHBB",
+            sequence,
+            width,
+            height,
+            0,
+            0,
+            max(0, round(1000 * delay)),
+            1000,
+            0,
+            0,
+        ),
+    )
+
+
+def frame_data(sequence, data):
+    "Return the fdAT chunk containing the compressed image data of a frame."
+    return chunk(b"fdAT", struct.pack(">I", sequence) + data)
+
+
+def indexed(rows, width, palette, transparent=None):
+    """Return the PNG image for the rows of palette indexes (0-255).
+    The palette is a list of (r, g, b) tuples. The index given by
+    'transparent', if any, is fully transparent.
+    """
+    compressor = zlib.compressobj()
+    data = []
+    height = 0
+    for row in rows:
+        data.append(compressor.compress(b"\x00" + bytes(row)))
+        height += 1
+    data.append(compressor.flush())
+    parts = [
+        SIGNATURE,
+        header(width, height, COLOR_TYPE_INDEXED),
+        chunk(b"PLTE", b"".join(bytes(rgb) for rgb in palette)),
+    ]
+    if transparent is not None:
+        parts.append(chunk(b"tRNS", b"\xff" * transparent + b"\x00"))
+    parts.append(chunk(b"IDAT", b"".join(data)))
+    parts.append(chunk(b"IEND", b""))
+    return b"".join(parts)
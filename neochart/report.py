@@ -0,0 +1,120 @@
+"""NeoChart. Multi-page PDF reports of charts.
+
+All charts are drawn as vectors onto one cairo PDF surface. Each chart is
+rendered by a cairosvg surface whose cairo surface is the rectangle of its
+cell on the current page of the shared PDF surface. Each page is emitted
+when it is full, so that memory use does not grow with the number of pages.
+"""
+
+import pathlib
+
+import cairocffi
+import cairosvg.parser
+import cairosvg.surface
+
+import instrument
+
+
+__all__ = ["PAGE_SIZES", "write_pdf"]
+
+# Page sizes in points (1/72 inch), portrait.
+PAGE_SIZES = {
+    "a3": (841.89, 1190.551),
+    "a4": (595.276, 841.89),
+    "a5": (419.528, 595.276),
+    "letter": (612.0, 792.0),
+    "legal": (612.0, 1008.0),
+}
+DEFAULT_MARGIN = 36.0
+DEFAULT_GAP = 18.0
+
+# With this resolution, one SVG pixel is one PDF point.
+DPI = 72
+
+
+class _CellSurface(cairosvg.surface.PDFSurface):
+    "Surface drawing an SVG tree into a rectangle of the shared PDF surface."
+
+    def __init__(self, tree, shared, x, y, width, height):
+        self.shared = shared
+        self.x = x
+        self.y = y
+        super().__init__(tree, None, DPI, output_width=width, output_height=height)
+
+    def _create_surface(self, width, height):
+        "Return the rectangle of the shared surface, and its size."
+        return (
+            self.shared.create_for_rectangle(self.x, self.y, width, height),
+            width,
+            height,
+        )
+
+
+def write_pdf(
+    charts,
+    filepath_or_stream,
+    page="a4",
+    columns=1,
+    rows=1,
+    margin=DEFAULT_MARGIN,
+    gap=DEFAULT_GAP,
+):
+    """Write the charts as a PDF document to a new file or the open binary
+    stream, placing 'columns' x 'rows' charts on each page. The page is
+    either a name in PAGE_SIZES or a tuple (width, height) in points.
+    Each chart is scaled to fit its cell, keeping its aspect ratio,
+    and centered in it. The charts may be any iterable, such as a generator,
+    and are rendered one at a time. Returns the number of pages.
+    """
+    if isinstance(page, str):
+        try:
+            page_width, page_height = PAGE_SIZES[page.casefold()]
+        except KeyError:
+            raise ValueError(f"unknown page size '{page}'")
+    else:
+        page_width, page_height = page
+    if columns < 1 or rows < 1:
+        raise ValueError("columns and rows must be at least 1")
+    cell_width = (page_width - 2 * margin - (columns - 1) * gap) / columns
+    cell_height = (page_height - 2 * margin - (rows - 1) * gap) / rows
+    if cell_width <= 0 or cell_height <= 0:
+        raise ValueError("no room for the charts on the page")
+    if isinstance(filepath_or_stream, (str, pathlib.Path)):
+        with open(filepath_or_stream, "wb") as outfile:
+            return write_pdf(
+                charts,
+                outfile,
+                page=page,
+                columns=columns,
+                rows=rows,
+                margin=margin,
+                gap=gap,
+            )
+
+    shared = cairocffi.PDFSurface(filepath_or_stream, page_width, page_height)
+    pages = 0
+    cell = 0
+    for chart in charts:
+        with instrument.stage("pdf"):
+            root = chart.svg()
+            width = float(root["width"])
+            height = float(root["height"])
+            if width == 0 or height == 0:
+                raise ValueError("the chart size is undefined")
+            scale = min(cell_width / width, cell_height / height)
+            column, row = cell % columns, cell // columns
+            x = margin + column * (cell_width + gap) + (cell_width - scale * width) / 2
+            y = margin + row * (cell_height + gap) + (cell_height - scale * height) / 2
+            tree = cairosvg.parser.Tree(bytestring=repr(root).encode())
+            surface = _CellSurface(tree, shared, x, y, scale * width, scale * height)
+            surface.cairo.flush()
+        cell += 1
+        if cell == columns * rows:
+            shared.show_page()
+            pages += 1
+            cell = 0
+    if cell or not pages:
+        shared.show_page()
+        pages += 1
+    shared.finish()
+    return pages
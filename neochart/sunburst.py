@@ -0,0 +1,317 @@
+"NeoChart sunburst chart."
+
+import array
+import csv
+import itertools
+import math
+
+from chart import *
+from piechart import sector_paths
+
+
+__all__ = ["Sunburst"]
+
+
+class Sunburst(Chart):
+    """Sunburst; a hierarchy drawn as rings of sectors, each node spanning
+    the part of its parent given by the total value of its subtree.
+    The nodes are stored in columns; 'parents' (index, or -1 for a root),
+    'values' and 'labels', which is None unless any node has one.
+    A single root is drawn as a disc in the center, several roots as
+    the slices of a pie. Each top-level branch has its own palette color,
+    and all sectors of a color are drawn as one path.
+    Sectors narrower than 'threshold' along their outer arc, and rings
+    narrower than it, are not drawn; neither are their descendants.
+    At most 'depth' rings are drawn, if given.
+    """
+
+    DEFAULT_RADIUS = 100.0
+    DEFAULT_THRESHOLD = 0.5
+    DEFAULT_STYLE = FrozenStyle(
+        stroke=Color("white"),
+        stroke_width=0.5,
+        fill=Color("lightgray"),
+        palette=Palette("#4c78a8", "#f58518", "#54a24b", "#e45756", "#72b7b2"),
+    )
+
+    def __init__(
+        self,
+        id=None,
+        klass=None,
+        radius=None,
+        start=None,
+        threshold=None,
+        depth=None,
+        style=None,
+        tree=None,
+        parents=None,
+        values=None,
+        labels=None,
+    ):
+        super().__init__(id=id, klass=klass, style=style)
+        self.radius = radius if radius is not None else self.DEFAULT_RADIUS
+        if isinstance(start, (int, float)):
+            self.start = Degrees(start)
+        else:
+            self.start = start
+        self.threshold = threshold if threshold is not None else self.DEFAULT_THRESHOLD
+        self.depth = depth
+        if tree is not None:
+            if parents is not None:
+                raise ValueError("give either a tree or parents, not both")
+            parents, values, labels = _flatten(tree)
+        parents = [] if parents is None else parents
+        values = [0] * len(parents) if values is None else values
+        if len(values) != len(parents):
+            raise ValueError("parents and values must have the same length")
+        if labels is not None and len(labels) != len(parents):
+            raise ValueError("parents and labels must have the same length")
+        # Buffers of the right type, such as external columns, are not copied.
+        if _typecode(parents) == "q":
+            self.parents = parents
+        else:
+            self.parents = array.array("q", [-1 if p is None else p for p in parents])
+        if _typecode(values) == "d":
+            self.values = values
+        else:
+            self.values = array.array("d", values)
+        if labels is not None and any(labels):
+            self.labels = list(labels)
+        else:
+            self.labels = None
+
+    @classmethod
+    def from_csv(
+        cls, infile, id="id", parent="parent", value="value", label="label", **kwargs
+    ):
+        """Create a sunburst chart from a parent-pointer table in CSV data
+        in the open file object. The first row gives the column names.
+        The parent column contains the id of the parent node, or nothing
+        for a root. The value and label columns are optional.
+        """
+        reader = csv.reader(infile)
+        header = next(reader)
+        try:
+            id_index = header.index(id)
+            parent_index = header.index(parent)
+        except ValueError:
+            raise ValueError(f"no columns '{id}' and '{parent}' in CSV data")
+        rows = list(reader)
+        indexes = {row[id_index]: i for i, row in enumerate(rows)}
+        try:
+            parents = [
+                indexes[row[parent_index]] if row[parent_index] else -1 for row in rows
+            ]
+        except KeyError as error:
+            raise ValueError(f"no node with id {error} in CSV data")
+        if value in header:
+            index = header.index(value)
+            values = [float(row[index] or 0) for row in rows]
+        else:
+            values = None
+        if label in header:
+            index = header.index(label)
+            labels = [row[index] or None for row in rows]
+        else:
+            labels = None
+        return cls(parents=parents, values=values, labels=labels, **kwargs)
+
+    @property
+    def extent(self):
+        return Vector2(2 * self.radius, 2 * self.radius) + Vector2(
+            self.style["stroke-width"], self.style["stroke-width"]
+        )
+
+    def order(self):
+        """Return the roots, and the children of all nodes in compressed form
+        as (offsets, children), where the children of node i are given by
+        children[offsets[i]:offsets[i+1]], and the nodes in breadth-first order.
+        Raise ValueError if the parents do not form a forest.
+        """
+        n = len(self.parents)
+        counts = array.array("q", [0]) * (n + 1)
+        roots = []
+        for i, parent in enumerate(self.parents):
+            if parent < 0:
+                roots.append(i)
+            elif parent >= n:
+                raise ValueError(f"invalid parent index {parent}")
+            else:
+                counts[parent + 1] += 1
+        offsets = array.array("q", itertools.accumulate(counts))
+        children = array.array("q", [0]) * n
+        positions = offsets[:-1]
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                children[positions[parent]] = i
+                positions[parent] += 1
+        nodes = array.array("q", roots)
+        i = 0
+        while i < len(nodes):
+            node = nodes[i]
+            nodes.extend(children[offsets[node] : offsets[node + 1]])
+            i += 1
+        if len(nodes) != n:
+            raise ValueError("the parents contain a cycle")
+        return roots, offsets, children, nodes
+
+    def totals(self, nodes=None):
+        """Return the total value of the subtree of each node, including its
+        own value. Computed in one pass upwards in the breadth-first order.
+        """
+        if nodes is None:
+            nodes = self.order()[3]
+        result = array.array("d", self.values)
+        parents = self.parents
+        for node in reversed(nodes):
+            if (parent := parents[node]) >= 0:
+                result[parent] += result[node]
+        return result
+
+    def svg_content(self, context=None):
+        "Return the SVG content element in minixml representation."
+        if context is None:
+            context = RenderContext()
+        result = super().svg_content(context)
+        self.style.setattrs(result, "stroke", "stroke-width", "fill")
+        if not len(self.parents):
+            return result
+        roots, offsets, children, nodes = self.order()
+        totals = self.totals(nodes)
+        # Depth of each node, and the number of rings to draw.
+        depths = array.array("q", [0]) * len(self.parents)
+        for node in nodes:
+            if (parent := self.parents[node]) >= 0:
+                depths[node] = depths[parent] + 1
+        rings = max(depths) + 1
+        if self.depth is not None:
+            rings = min(rings, self.depth)
+        rings = max(1, min(rings, int(self.radius / self.threshold)))
+        width = self.radius / rings
+
+        palette = [str(c) for c in self.style["palette"].colors]
+        colors = itertools.cycle(range(len(palette)))
+        # Palette index of each drawn node; -1 for the fill of the chart,
+        # -2 for a node which is not drawn.
+        fills = array.array("q", [-2]) * len(self.parents)
+        starts = array.array("d", [0.0]) * len(self.parents)
+        spans = array.array("d", [0.0]) * len(self.parents)
+        paths = {}
+        start = self.start - Degrees(90) if self.start else Degrees(-90)
+
+        def add_ring(group, ring, start, span, total, fill):
+            "Add the sectors of the nodes in the group to the paths."
+            if total <= 0.0:
+                return
+            inner = ring * width
+            outer = inner + width
+            minimum = math.degrees(self.threshold / outer)
+            steps = [totals[node] / total * span for node in group]
+            stops = DegreesArray.accumulate(start, steps)
+            for i, (node, d) in enumerate(
+                zip(group, sector_paths(stops, outer, inner, context.decimals))
+            ):
+                if steps[i] < minimum:
+                    continue
+                if steps[i] > 359.999:
+                    d = _circle_path(outer, inner, context.N)
+                starts[node] = stops.degrees[i]
+                spans[node] = steps[i]
+                fills[node] = next(colors) if fill == -1 else fill
+                paths.setdefault(fills[node], []).append(d)
+
+        if len(roots) == 1:
+            # The single root is the center disc, in the fill of the chart.
+            fills[roots[0]] = -1
+            starts[roots[0]] = start.degrees
+            spans[roots[0]] = 360.0
+            result += Element("circle", r=context.N(width))
+        else:
+            add_ring(roots, 0, start, 360.0, sum(totals[r] for r in roots), -1)
+        for node in nodes:
+            ring = depths[node] + 1
+            if fills[node] == -2 or ring >= rings:
+                continue
+            group = children[offsets[node] : offsets[node + 1]]
+            if group:
+                add_ring(
+                    group, ring, starts[node], spans[node], totals[node], fills[node]
+                )
+        for index in sorted(paths):
+            result += Element("path", d=" ".join(paths[index]), fill=palette[index])
+        return result
+
+    def as_dict_content(self, sidecar=None):
+        """Return content as a dictionary of basic YAML values. If a sidecar
+        (columns.Sidecar) is given, the parents and values are written as
+        external column files.
+        """
+        data = super().as_dict_content()
+        data["radius"] = self.radius
+        data["start"] = None if self.start is None else self.start.degrees
+        data["threshold"] = self.threshold
+        if self.depth is not None:
+            data["depth"] = self.depth
+        if sidecar is None:
+            data["parents"] = [None if p < 0 else p for p in self.parents]
+            data["values"] = self.values.tolist()
+        else:
+            for name in ["parents", "values"]:
+                data[name] = sidecar.external(getattr(self, name), name)
+        if self.labels is not None:
+            data["labels"] = list(self.labels)
+        return data
+
+
+def _typecode(values):
+    "Return the typecode of the array or memoryview, else None."
+    if isinstance(values, array.array):
+        return values.typecode
+    elif isinstance(values, memoryview):
+        return values.format
+    else:
+        return None
+
+
+def _flatten(tree):
+    """Return the columns parents, values and labels for the nested tree;
+    a dictionary with the optional items 'label', 'value' and 'children',
+    or a list of such for several roots. Nodes are in depth-first order.
+    """
+    parents = []
+    values = []
+    labels = []
+    if isinstance(tree, dict):
+        tree = [tree]
+    stack = [(node, -1) for node in reversed(tree)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(parents)
+        parents.append(parent)
+        values.append(node.get("value") or 0)
+        labels.append(node.get("label"))
+        for child in reversed(node.get("children") or []):
+            stack.append((child, index))
+    return parents, values, labels
+
+
+def _circle_path(outer, inner, N):
+    """Return the SVG path of the full ring from radius 'inner' to 'outer',
+    with numbers formatted by the function N.
+    """
+    result = [
+        f"M {N(outer)} 0 A {N(outer)} {N(outer)} 0 1 1"
+        f" {N(-outer)} 0 A {N(outer)} {N(outer)} 0 1 1"
+        f" {N(outer)} 0 Z"
+    ]
+    if inner:
+        # Opposite direction, to leave a hole with the nonzero fill rule.
+        result.append(
+            f"M {N(inner)} 0 A {N(inner)} {N(inner)} 0 1 0"
+            f" {N(-inner)} 0 A {N(inner)} {N(inner)} 0 1 0"
+            f" {N(inner)} 0 Z"
+        )
+    return " ".join(result)
+
+
+add_chart(Sunburst)
@@ -29,3 +29,335 @@ if __name__ == "__main__":
     contents2 = pyramid.as_dict()
     assert contents1 == contents2
     pyramid.write_png("pyramid.png")
+
+    # Tiled rendering must give the same pixels as untiled rendering.
+    import PIL.Image
+
+    def pixels(**kwargs):
+        buffer = io.BytesIO()
+        pyramid.write_png(buffer, **kwargs)
+        buffer.seek(0)
+        image = PIL.Image.open(buffer).convert("RGBA")
+        return image.size, image.tobytes()
+
+    for scale in (1.0, 1.37):
+        untiled = pixels(scale=scale)
+        assert pixels(scale=scale, tile=64, workers=1) == untiled
+        assert pixels(scale=scale, tile=64, workers=2) == untiled
+
+    # The slices are a tuple; assigning them replaces the columns.
+    copied = Piechart(
+        id="pyramid", klass="piechart", start=Degrees(132), style=pyramid.style
+    )
+    copied.slices = pyramid.slices
+    assert copied.as_dict() == pyramid.as_dict()
+
+    # Bulk vectors and angles agree with the single ones, and are immutable.
+    import math
+    import pickle
+
+    vectors = Vector2Array([1, 0, -3], [0, 2, 4])
+    assert list(vectors + vectors) == [v + v for v in vectors]
+    assert list(vectors - Vector2(1, 1)) == [v - Vector2(1, 1) for v in vectors]
+    assert list(vectors.r) == [1, 2, 5]
+    assert list(vectors.normalized.r) == [1, 1, 1]
+    rotated = vectors.rotate(math.pi / 2)
+    assert all(abs(a - b) < 1e-12 for a, b in zip(rotated.xs, [0, -2, -4]))
+    assert all(abs(a - b) < 1e-12 for a, b in zip(rotated.ys, [1, 0, -3]))
+    again = Vector2Array.from_polar(vectors.r, (phi for phi in vectors.phi))
+    assert all(abs(a - b) < 1e-12 for a, b in zip(again.xs, vectors.xs))
+    assert all(abs(a - b) < 1e-12 for a, b in zip(again.ys, vectors.ys))
+    assert len(Vector2Array.from_polar(2, (phi for phi in vectors.phi))) == 3
+    angles = DegreesArray.accumulate(Degrees(90), [90, 180, 45])
+    assert list(angles) == [Degrees(90), Degrees(180), Degrees(360), Degrees(405)]
+    assert list(angles.normalized()) == [Degrees(d) for d in (90, 180, 0, 45)]
+    assert list(angles - angles) == [Degrees(0)] * 4
+    assert list(angles.radians) == [a.radians for a in angles]
+    for bulk in (vectors, angles):
+        assert pickle.loads(pickle.dumps(bulk)) == bulk
+    for mutate in (
+        lambda: vectors.xs.__setitem__(0, 5.0),
+        lambda: angles.degrees.__setitem__(0, 5.0),
+    ):
+        try:
+            mutate()
+            raise AssertionError("bulk array modified")
+        except TypeError:
+            pass
+    for mismatched in (
+        lambda: vectors + Vector2Array([1], [1]),
+        lambda: angles + DegreesArray([1]),
+        lambda: Vector2Array.from_polar([1, 2], [0.0]),
+    ):
+        try:
+            mismatched()
+            raise AssertionError("arrays of different lengths combined")
+        except ValueError:
+            pass
+
+    # Labels on each side of the pie do not overlap, and survive a round trip.
+    import fontmetrics
+
+    labeled = Piechart(id="labeled", show_labels=True)
+    for i in range(30):
+        labeled += Slice(1 + i % 4 + (20 if i == 0 else 0), f"label {i}")
+    root = labeled.svg()
+    texts = list(root.walk(lambda e: e.tag == "text"))
+    assert len(texts) == 30
+    size = float(texts[0].superelement["font-size"])
+    for anchor in ("start", "end"):
+        ys = sorted(float(e["y"]) for e in texts if e["text-anchor"] == anchor)
+        assert ys and all(b - a >= 1.2 * size - 0.01 for a, b in zip(ys, ys[1:]))
+    buffer = io.StringIO()
+    write(labeled, buffer)
+    buffer.seek(0)
+    copied = read(buffer)
+    assert copied.show_labels and repr(copied.svg()) == repr(root)
+    for family in ("../../x", "a/b", "..", "DejaVu Sans"):
+        name = fontmetrics.cache_filename(family, "normal")
+        assert "/" not in name and not name.startswith(".")
+
+    # Concurrent rendering must give the same output as serial rendering.
+    import concurrent.futures
+    import minixml
+
+    charts = []
+    for i in range(40):
+        chart = Piechart(id=f"pie{i}", start=Degrees(3 * i))
+        for j in range(1 + i % 7):
+            chart += Slice(j + i + 1, f"slice {j}")
+        charts.append(chart)
+    serial = [repr(chart.svg()) for chart in charts]
+    for attempt in range(5):
+        assert render_many(charts, workers=8) == serial
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        texts = list(executor.map(lambda t: repr(minixml.parse(t)), serial * 5))
+    assert texts == [repr(minixml.parse(t)) for t in serial * 5]
+
+    # Structural digests; equal trees hash alike, and changes propagate upwards.
+    def nested(*subelements, tag="g", **attrs):
+        result = Element(tag, **attrs)
+        for subelement in subelements:
+            result += subelement
+        return result
+
+    first = minixml.parse(serial[7])
+    second = minixml.parse(serial[7])
+    assert first.digest == second.digest and first == second
+    assert minixml.parse(serial[8]).digest != first.digest
+    assert nested(x="a\0b").digest != nested(x="a", b="").digest
+    assert nested("x", "y").digest != nested("xy").digest
+    digest = first.digest
+    leaf = list(first.walk())[-1]
+    fill = leaf["fill"]
+    leaf["fill"] = "#010203"
+    assert first.digest != digest and first != second
+    leaf["fill"] = fill
+    assert first.digest == digest
+
+    # Duplicate subtrees; copies inside a reported subtree are not counted.
+    root = nested(*[nested(Element("rect", width=5)) for i in range(3)])
+    root += Element("rect", width=5)
+    assert [len(group) for group in root.duplicates()] == [3]
+    root += nested(Element("rect", width=5))
+    root += Element("rect", width=5)
+    groups = root.duplicates()
+    assert [(group[0].tag, len(group)) for group in groups] == [("g", 4), ("rect", 2)]
+
+    # A compiled render plan must give the same output as rendering the chart.
+    import random
+
+    generator = random.Random(5)
+    for i in range(200):
+        chart = Piechart(
+            id=generator.choice([None, "plan"]),
+            start=generator.choice([None, 45.5, 132]),
+            radius=generator.choice([50, 100.0]),
+            total=generator.choice([None, 500]),
+            style=generator.choice([None, Style(palette=Palette("red", "blue"))]),
+        )
+        values = [
+            generator.choice([generator.random() * 100, generator.randint(1, 50)])
+            for j in range(generator.randint(0, 12))
+        ]
+        fills = [
+            generator.choice([None, "pink", Color("#123456"), "a&b"]) for v in values
+        ]
+        plan = chart.compile()
+        for value, fill in zip(values, fills):
+            chart += Slice(value, None, Style(fill=fill) if fill else None)
+        assert plan.render(values, fills) == repr(chart.svg())
+    try:
+        plan.render([1, 2], ["red"])
+        raise AssertionError("fills of the wrong length accepted")
+    except ValueError:
+        pass
+    plan = Heatmap(values=[[1, 2]]).compile()
+    assert plan.render() == repr(Heatmap(values=[[1, 2]]).svg())
+    try:
+        plan.render([[3, 4]])
+        raise AssertionError("data given to a plan without items ignored")
+    except TypeError:
+        pass
+
+    # Asyncio rendering and reading, in threads and in processes.
+    import asyncio
+    import time
+
+    import aio
+
+    class SlowStream(io.StringIO):
+        def read(self, *args):
+            time.sleep(0.2)
+            return super().read(*args)
+
+    stream = "piechart: {slices: [1]}\n---\nsunburst: {parents: [null, 0]}\n"
+
+    async def collect(stream, renderer=None):
+        return [chart async for chart in aio.aread(stream, renderer=renderer)]
+
+    async def main():
+        assert await aio.render_svg(pyramid) == repr(pyramid.svg())
+        buffer = io.BytesIO()
+        pyramid.write_png(buffer)
+        assert await aio.render_png(pyramid) == buffer.getvalue()
+        charts = await collect(io.StringIO(stream))
+        assert [type(c) for c in charts] == [Piechart, Sunburst]
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            renderer = aio.Renderer(executor, limit=1)
+            assert await renderer.render_svg(pyramid) == repr(pyramid.svg())
+            charts = await collect(io.StringIO(stream), renderer)
+            assert [repr(c.svg()) for c in charts] == [
+                repr(c.svg()) for c in read_all(io.StringIO(stream))
+            ]
+        # Closing early, and cancelling while a document is being read.
+        documents = aio.aread(io.StringIO(stream))
+        assert isinstance(await anext(documents), Piechart)
+        await documents.aclose()
+        task = asyncio.create_task(collect(SlowStream(stream)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("reading not cancelled")
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+
+    # Animation through data states; one animated path per slice.
+    from animation import Animation
+
+    animation = Animation(pyramid, [(10, 15, 70), (30, 30, 40)], steps=4)
+    assert len(animation) == len(list(animation.frames())) == 5
+    root = animation.svg()
+    animates = list(root.walk(lambda e: e.tag == "animate"))
+    assert len(animates) == 3
+    assert all(len(e["values"].split(";")) == 5 for e in animates)
+    animation.write("pyramid_animated.svg")
+
+    # Sunburst from a nested tree and from a parent-pointer table.
+    tree = {
+        "label": "root",
+        "children": [
+            {"label": "a", "children": [{"value": 1}, {"value": 2}]},
+            {"label": "b", "value": 5},
+        ],
+    }
+    sunburst = Sunburst(tree=tree)
+    assert list(sunburst.totals()) == [8, 3, 1, 2, 5]
+    table = Sunburst(
+        parents=[None, 0, 1, 1, 0],
+        values=[0, 0, 1, 2, 5],
+        labels=["root", "a", None, None, "b"],
+    )
+    assert repr(table.svg()) == repr(sunburst.svg())
+    buffer = io.StringIO()
+    write(sunburst, buffer)
+    buffer.seek(0)
+    assert repr(read(buffer).svg()) == repr(sunburst.svg())
+
+    # Write and read in every format, detected from the suffix and the content.
+    import os
+    import tempfile
+
+    styled = Piechart(id="styled", start=Degrees(45))
+    styled += Slice(1.5, "one", Style(fill="red", stroke_width=0.25))
+    styled += Slice(2, None, Style(stroke="blue"))
+    styled += (3, "three")
+    heatmap = Heatmap(id="heat", vmin=0, values=[[1, None, 3], [None, 2.5, 0]])
+    suffixes = {"yaml": ".yaml", "json": ".json", "binary": ".ncb"}
+    with tempfile.TemporaryDirectory() as dirpath:
+        for format in FORMATS:
+            assert get_format(f"chart{suffixes[format]}") == format
+            for chart in [styled, heatmap, sunburst]:
+                if format == "binary":
+                    buffer = io.BytesIO()
+                else:
+                    buffer = io.StringIO()
+                write(chart, buffer, format=format)
+                content = buffer.getvalue()
+                assert parse_document(loads(content)).as_dict() == chart.as_dict()
+                filepath = os.path.join(dirpath, f"chart{suffixes[format]}")
+                with open(filepath, "wb" if format == "binary" else "w") as outfile:
+                    outfile.write(content)
+                assert read(filepath).as_dict() == chart.as_dict()
+
+    # Coordinates rounded for the render context stay within the tolerance.
+    import re
+
+    number = re.compile(r"-?\d+(?:\.\d+)?")
+    exact = RenderContext(decimals=9)
+    for chart in [pyramid, sunburst, charts[13]]:
+        reference = [float(n) for n in number.findall(repr(chart.svg(exact)))]
+        for scale in (0.1, 1.0, 3.3, 50.0):
+            for tolerance in (0.01, 0.05, 0.5):
+                context = chart.render_context(scale=scale, tolerance=tolerance)
+                numbers = number.findall(repr(chart.svg(context)))
+                assert len(numbers) == len(reference)
+                error = max(abs(float(n) - r) for n, r in zip(numbers, reference))
+                assert error * scale <= tolerance, (scale, tolerance, error)
+    assert RenderContext().decimals == 3
+    assert repr(pyramid.svg(RenderContext())) == repr(pyramid.svg())
+
+    # Numerical columns written as external files, memory-mapped on reading.
+    with tempfile.TemporaryDirectory() as dirpath:
+        filepath = os.path.join(dirpath, "pyramid.yaml")
+        with open(filepath, "w") as outfile:
+            write(pyramid, outfile, sidecar=dirpath)
+        mapped = read(filepath)
+        assert isinstance(mapped.values, memoryview)
+        assert repr(mapped.svg()) == repr(pyramid.svg())
+        assert repr(pickle.loads(pickle.dumps(mapped)).svg()) == repr(mapped.svg())
+        # Copies share the mapped columns; compiling copies the chart.
+        import copy
+
+        assert copy.copy(mapped).values is mapped.values
+        assert mapped.compile().render(mapped.values) == repr(mapped.svg())
+        del mapped
+        # The column file belongs to pyramid.yaml; not to another output.
+        with open(os.path.join(dirpath, "pyramid.json"), "w") as outfile:
+            try:
+                write(pyramid, outfile, format="json", sidecar=dirpath)
+                raise AssertionError("column file of another chart overwritten")
+            except ValueError:
+                pass
+        # Without a file name, the files are named after the id or the class.
+        for attempt in range(2):
+            write(Piechart(values=[1, 2]), io.StringIO(), sidecar=dirpath)
+        assert os.path.exists(os.path.join(dirpath, "piechart.values.ncc"))
+        # Rewriting a column file leaves the charts that have it mapped intact.
+        filepath = os.path.join(dirpath, "large.yaml")
+        with open(filepath, "w") as outfile:
+            write(
+                Piechart(id="large", values=list(range(1, 1001))),
+                outfile,
+                sidecar=dirpath,
+            )
+        mapped = read(filepath)
+        text = repr(mapped.svg())
+        with open(filepath, "w") as outfile:
+            write(Piechart(id="large", values=[1, 2]), outfile, sidecar=dirpath)
+        assert repr(mapped.svg()) == text
+        assert len(read(filepath).values) == 2
+        del mapped
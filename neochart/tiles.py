@@ -0,0 +1,114 @@
+"""NeoChart. Tiled, parallel rasterization of a chart into a PNG image.
+
+The image is rendered in horizontal strips of at most tile x tile pixels
+by a pool of worker processes. The strips are written to the output PNG
+in order as they are done, so that the peak memory is bounded by the
+strip size times the number of workers, not by the image size.
+"""
+
+import collections
+import concurrent.futures
+import io
+import itertools
+import os
+import zlib
+
+import cairosvg
+
+import png
+
+
+__all__ = ["write_png"]
+
+DEFAULT_TILE = 1024
+
+# Set in each worker process by '_initialize'.
+_strips = None
+
+
+def write_png(chart, outfile, scale=1.0, tile=DEFAULT_TILE, workers=None, context=None):
+    "Write the chart as a PNG image into the open binary file object."
+    assert scale > 0.0
+    root = chart.svg(context)
+    width = int(float(root["width"]) * scale)
+    height = int(float(root["height"]) * scale)
+    if width == 0 or height == 0:
+        raise ValueError("the chart size is undefined")
+    rows = max(1, (tile * tile) // width)
+    strips = [(y, min(rows, height - y)) for y in range(0, height, rows)]
+    workers = workers or os.cpu_count() or 1
+    outfile.write(png.SIGNATURE)
+    outfile.write(png.header(width, height, png.COLOR_TYPE_RGBA))
+    compressor = zlib.compressobj()
+    if workers == 1:
+        # Local state, so that concurrent calls in threads do not interfere.
+        renderer = _Strips(root, scale)
+        for y, h in strips:
+            _write_strip(outfile, compressor, renderer.render(y, h), width)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_initialize, initargs=(root, scale)
+        ) as executor:
+            # Keep at most two strips per worker in flight.
+            strips = iter(strips)
+            pending = collections.deque(
+                executor.submit(_render_strip, *strip)
+                for strip in itertools.islice(strips, 2 * workers)
+            )
+            while pending:
+                data = pending.popleft().result()
+                for strip in itertools.islice(strips, 1):
+                    pending.append(executor.submit(_render_strip, *strip))
+                _write_strip(outfile, compressor, data, width)
+    outfile.write(png.chunk(b"IDAT", compressor.flush()))
+    outfile.write(png.chunk(b"IEND", b""))
+
+
+def _write_strip(outfile, compressor, data, width):
+    "Compress the rows of RGBA data and write as an IDAT chunk, if any output."
+    stride = 4 * width
+    output = [
+        compressor.compress(b"\x00" + data[i : i + stride])
+        for i in range(0, len(data), stride)
+    ]
+    if output := b"".join(output):
+        outfile.write(png.chunk(b"IDAT", output))
+
+
+def _initialize(root, scale):
+    "Set the SVG root element and the scale for the strips rendered by this process."
+    global _strips
+    _strips = _Strips(root, scale)
+
+
+def _render_strip(y, height):
+    "Render the strip using the state of this process."
+    return _strips.render(y, height)
+
+
+class _Strips:
+    "Renderer of horizontal strips of the SVG root element at the given scale."
+
+    def __init__(self, root, scale):
+        self.root = root
+        self.text = repr(root)
+        self.start = str(root)
+        self.scale = scale
+        self.width = int(float(root["width"]) * scale)
+        self.origin = [float(v) for v in root["viewBox"].split()[:2]]
+
+    def render(self, y, height):
+        """Render the horizontal strip of the image starting at pixel row y.
+        Return its pixels as RGBA bytes.
+        """
+        import PIL.Image
+
+        self.root["width"] = self.width
+        self.root["height"] = height
+        self.root["viewBox"] = (
+            f"{self.origin[0]} {self.origin[1] + y / self.scale}"
+            f" {self.width / self.scale} {height / self.scale}"
+        )
+        text = self.text.replace(self.start, str(self.root), 1)
+        data = cairosvg.svg2png(bytestring=text.encode())
+        return PIL.Image.open(io.BytesIO(data)).convert("RGBA").tobytes()
@@ -1,22 +1,69 @@
 "Utility functions and classes."
 
+import math
+
+DECIMALS = 3
 PRECISION = 0.0005
+TOLERANCE = 0.05
 
 
-def N(x):
-    "Return a compact representation of the numerical value."
-    if (x < 0.0 and -x % 1.0 < PRECISION) or x % 1.0 < PRECISION:
+def N(x, decimals=DECIMALS):
+    """Return a compact representation of the numerical value,
+    rounded to the given number of decimals.
+    """
+    precision = PRECISION if decimals == DECIMALS else 0.5 * 10.0**-decimals
+    if (x < 0.0 and -x % 1.0 < precision) or x % 1.0 < precision:
         return f"{round(x):d}"
     else:
-        return f"{x:.3f}"
+        return f"{x:.{decimals}f}"
+
+
+class RenderContext:
+    """Render context; the number of decimals for coordinates in the output.
+    The default gives the same output as N without decimals.
+    """
+
+    @classmethod
+    def for_output(cls, extent, scale=1.0, width=None, tolerance=TOLERANCE):
+        """Return the context giving at most 'tolerance' pixels rounding error
+        in the output at the given scale. If the output width in pixels
+        is given, the scale is derived from it and the extent of the chart.
+        """
+        if width is not None:
+            if extent.x <= 0.0:
+                raise ValueError("the chart size is undefined")
+            scale = width / extent.x
+        if scale <= 0.0 or tolerance <= 0.0:
+            raise ValueError("scale and tolerance must be positive")
+        return cls(max(0, math.ceil(math.log10(0.5 * scale / tolerance))))
+
+    def __init__(self, decimals=DECIMALS):
+        self.decimals = decimals
+
+    def __repr__(self):
+        return f"RenderContext(decimals={self.decimals})"
+
+    @property
+    def error(self):
+        "Maximum rounding error of a coordinate, in user units."
+        return 0.5 * 10.0**-self.decimals
+
+    def N(self, x):
+        "Return a compact representation of the value with these decimals."
+        return N(x, self.decimals)
+
+    def Path(self, v0, *v):
+        "Return a Path with these decimals."
+        return Path(v0, *v, decimals=self.decimals)
 
 
 class Path:
     "SVG path synthesizer."
 
-    def __init__(self, v0, *v):
+    def __init__(self, v0, *v, decimals=DECIMALS):
         "Moveto v0, then lineto any v's. Absolute coordinates."
         self.parts = []
+        self.decimals = decimals
         self.M(v0, *v)
 
     def __str__(self):
@@ -44,22 +91,22 @@ class Path:
 
     def H(self, x):
         "Horizontal lineto. Absolute coordinates."
-        self.parts.append(f"H {x:.5g}")
+        self.parts.append(f"H {N(x, self.decimals)}")
         return self
 
     def h(self, x):
         "Horizontal lineto. Relative coordinates."
-        self.parts.append(f"h {x:.5g}")
+        self.parts.append(f"h {N(x, self.decimals)}")
         return self
 
     def V(self, x):
         "Vertical lineto. Absolute coordinates."
-        self.parts.append(f"V {x:.5g}")
+        self.parts.append(f"V {N(x, self.decimals)}")
         return self
 
     def v(self, x):
         "Vertical lineto. Relative coordinates."
-        self.parts.append(f"v {x:.5g}")
+        self.parts.append(f"v {N(x, self.decimals)}")
         return self
 
     def C(self, v1, v2, v):
@@ -104,15 +151,19 @@ class Path:
 
     def A(self, xr, yr, xrot, laf, sf, v):
         "Elliptical arc. Absolute coordinates."
+        d = self.decimals
         self.parts.append(
-            f"A {N(xr)} {N(yr)} {N(xrot)} {N(laf)} {N(sf)} {N(v.x)} {N(v.y)}"
+            f"A {N(xr, d)} {N(yr, d)} {N(xrot, d)} {N(laf)} {N(sf)}"
+            f" {N(v.x, d)} {N(v.y, d)}"
         )
         return self
 
-    def a(self, rx, ry, xrot, laf, sf, v):
+    def a(self, xr, yr, xrot, laf, sf, v):
         "Elliptical arc. Relative coordinates."
+        d = self.decimals
         self.parts.append(
-            f"a {N(xr)} {N(yr)} {N(xrot)} {N(laf)} {N(sf)} {N(v.x)} {N(v.y)}"
+            f"a {N(xr, d)} {N(yr, d)} {N(xrot, d)} {N(laf)} {N(sf)}"
+            f" {N(v.x, d)} {N(v.y, d)}"
         )
         return self
 
@@ -124,5 +175,7 @@ class Path:
         bits = []
         if not (concatenate and self.parts[-1][0] == command):
             bits.append(command)
-        bits.append(" ".join([f"{N(w.x)} {N(w.y)}" for w in v]))
+        bits.append(
+            " ".join([f"{N(w.x, self.decimals)} {N(w.y, self.decimals)}" for w in v])
+        )
         self.parts.append(" ".join(bits))
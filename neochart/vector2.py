@@ -1,29 +1,33 @@
-"Two-dimensional vector (x, y). Immutable."
+"Two-dimensional vector (x, y), and array of such. Immutable."
 
 from __future__ import annotations
 
+import array
 import math
 
 
 class Vector2:
     "Two-dimensional vector (x, y). Immutable."
 
+    __slots__ = ("x", "y")
+
     @classmethod
     def from_polar(cls, r: int | float, phi: int | float) -> Vector2:
         "Return a Vector2 instance defined by polar coordinates (radians)."
         return Vector2(r * math.cos(phi), r * math.sin(phi))
 
     def __init__(self, x: int | float, y: int | float):
-        self._x = x
-        self._y = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
 
-    @property
-    def x(self) -> int | float:
-        return self._x
+    def __setattr__(self, name, value):
+        raise AttributeError("Vector2 is immutable")
 
-    @property
-    def y(self) -> int | float:
-        return self._y
+    def __delattr__(self, name):
+        raise AttributeError("Vector2 is immutable")
+
+    def __reduce__(self):
+        return (Vector2, (self.x, self.y))
 
     def __repr__(self) -> str:
         return f"Vector2({self.x}, {self.y})"
@@ -31,6 +35,15 @@ class Vector2:
     def __str__(self) -> str:
         return f"Vector2({self.x:g}, {self.y:g})"
 
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Vector2):
+            return self.x == other.x and self.y == other.y
+        else:
+            return False
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
     def __abs__(self) -> float:
         return math.sqrt(self.x**2 + self.y**2)
 
@@ -75,6 +88,133 @@ class Vector2:
         return (self.r, self.phi)
 
 
+class Vector2Array:
+    """Sequence of two-dimensional vectors stored as two arrays of floats,
+    exposed as the read-only memoryviews 'xs' and 'ys'. Operations are done
+    in bulk, without creating a Vector2 per item. Immutable.
+    """
+
+    __slots__ = ("xs", "ys")
+
+    @classmethod
+    def from_polar(cls, r, phis) -> Vector2Array:
+        """Return an instance defined by polar coordinates (radians).
+        The radius is either a single number or a sequence.
+        """
+        phis = list(phis)
+        if isinstance(r, (int, float)):
+            return Vector2Array(
+                [r * math.cos(phi) for phi in phis],
+                [r * math.sin(phi) for phi in phis],
+            )
+        else:
+            r = list(r)
+            if len(r) != len(phis):
+                raise ValueError("radius and angle arrays must have the same length")
+            return Vector2Array(
+                [r * math.cos(phi) for r, phi in zip(r, phis)],
+                [r * math.sin(phi) for r, phi in zip(r, phis)],
+            )
+
+    @classmethod
+    def from_vectors(cls, vectors) -> Vector2Array:
+        "Return an instance containing the given Vector2 instances."
+        vectors = list(vectors)
+        return Vector2Array([v.x for v in vectors], [v.y for v in vectors])
+
+    def __init__(self, xs, ys):
+        xs = array.array("d", xs)
+        ys = array.array("d", ys)
+        if len(xs) != len(ys):
+            raise ValueError("x and y arrays must have the same length")
+        object.__setattr__(self, "xs", memoryview(xs).toreadonly())
+        object.__setattr__(self, "ys", memoryview(ys).toreadonly())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Vector2Array is immutable")
+
+    def __reduce__(self):
+        return (Vector2Array, (self.xs.tolist(), self.ys.tolist()))
+
+    def __repr__(self) -> str:
+        return f"Vector2Array({self.xs.tolist()}, {self.ys.tolist()})"
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __getitem__(self, i: int) -> Vector2:
+        return Vector2(self.xs[i], self.ys[i])
+
+    def __iter__(self):
+        for x, y in zip(self.xs, self.ys):
+            yield Vector2(x, y)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Vector2Array):
+            return self.xs == other.xs and self.ys == other.ys
+        else:
+            return False
+
+    __hash__ = None
+
+    def __neg__(self) -> Vector2Array:
+        return Vector2Array([-x for x in self.xs], [-y for y in self.ys])
+
+    def __add__(self, other: Vector2 | Vector2Array) -> Vector2Array:
+        if isinstance(other, Vector2):
+            return Vector2Array(
+                [x + other.x for x in self.xs], [y + other.y for y in self.ys]
+            )
+        else:
+            if len(self) != len(other):
+                raise ValueError("arrays must have the same length")
+            return Vector2Array(
+                [x1 + x2 for x1, x2 in zip(self.xs, other.xs)],
+                [y1 + y2 for y1, y2 in zip(self.ys, other.ys)],
+            )
+
+    def __sub__(self, other: Vector2 | Vector2Array) -> Vector2Array:
+        return self + (-other)
+
+    def __truediv__(self, other: int | float) -> Vector2Array:
+        return Vector2Array([x / other for x in self.xs], [y / other for y in self.ys])
+
+    def __rmul__(self, other: int | float) -> Vector2Array:
+        return Vector2Array([other * x for x in self.xs], [other * y for y in self.ys])
+
+    def rotate(self, phi: int | float) -> Vector2Array:
+        "Return the vectors rotated by the angle (radians) around the origin."
+        cos = math.cos(phi)
+        sin = math.sin(phi)
+        return Vector2Array(
+            [cos * x - sin * y for x, y in zip(self.xs, self.ys)],
+            [sin * x + cos * y for x, y in zip(self.xs, self.ys)],
+        )
+
+    @property
+    def normalized(self) -> Vector2Array:
+        lengths = self.r
+        return Vector2Array(
+            [x / length for x, length in zip(self.xs, lengths)],
+            [y / length for y, length in zip(self.ys, lengths)],
+        )
+
+    @property
+    def r(self) -> array.array:
+        "Return the array of the radius part of the polar coordinates."
+        return array.array("d", map(math.hypot, self.xs, self.ys))
+
+    @property
+    def phi(self) -> array.array:
+        "Return the array of the angle part of the polar coordinates (radians)."
+        return array.array("d", map(math.atan2, self.ys, self.xs))
+
+    @property
+    def polar(self) -> tuple[array.array, array.array]:
+        "Return the tuple of arrays (r, phi) for this instance (radians)."
+        return (self.r, self.phi)
+
+
 if __name__ == "__main__":
     v = Vector2(1, 2)
     print(v.normalized)
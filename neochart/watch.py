@@ -0,0 +1,159 @@
+"""NeoChart. Poll a directory tree and render the chart files that changed.
+
+A manifest of the content hash and output parameters of each rendered file,
+and the content hashes of the external column files it refers to, is kept
+in the directory, so that unchanged files are not rendered again, also not
+after a restart. A file is rendered only when it has not been
+modified for the debounce interval, so that bursts of saves render once.
+"""
+
+import hashlib
+import json
+import pathlib
+import time
+
+import chart as _chart
+import columns
+
+
+__all__ = ["Watcher"]
+
+
+class Watcher:
+    "Poll the directory tree for chart files, and render those that changed."
+
+    MANIFEST = ".neochart-manifest.json"
+
+    def __init__(self, dirpath, format="svg", scale=1.0, indent=2, debounce=0.5):
+        if format not in ("svg", "png"):
+            raise ValueError(f"invalid output format '{format}'")
+        self.dirpath = pathlib.Path(dirpath)
+        self.format = format
+        self.scale = scale
+        self.indent = indent
+        self.debounce = debounce
+        self.stats = {}
+        try:
+            with open(self.dirpath / self.MANIFEST) as infile:
+                self.manifest = json.load(infile)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    @property
+    def parameters(self):
+        "The output parameters; a change causes all files to be rendered."
+        if self.format == "svg":
+            return dict(format=self.format, indent=self.indent)
+        else:
+            return dict(format=self.format, scale=self.scale)
+
+    def run(self, interval=1.0, callback=None):
+        "Poll the directory tree at the given interval (seconds) until interrupted."
+        while True:
+            self.poll(callback=callback)
+            time.sleep(interval)
+
+    def poll(self, callback=None):
+        """Render the files that changed since the last poll.
+        The callback, if any, is called with the file path and the error,
+        if any, for each rendered file. Return the list of rendered files.
+        """
+        now = time.time()
+        stats = {}
+        rendered = []
+        for filepath in self.dirpath.rglob("*"):
+            if filepath.name == self.MANIFEST or not filepath.is_file():
+                continue
+            if _chart.get_format(filepath) is None:
+                continue
+            key = str(filepath.relative_to(self.dirpath))
+            previous = self.manifest.get(key, {})
+            # The external column files referred to when last rendered.
+            names = list(previous.get("columns") or {})
+            stats[key] = (_stat(filepath), *(_stat(filepath.parent / n) for n in names))
+            if stats[key] == self.stats.get(key):
+                continue
+            if stats[key][0] is None:
+                # Removed since listed.
+                del stats[key]
+                continue
+            mtime = max(stat[0] for stat in stats[key] if stat is not None)
+            if now - mtime / 1e9 < self.debounce:
+                # Still being saved; look again at the next poll.
+                del stats[key]
+                continue
+            try:
+                with open(filepath, "rb") as infile:
+                    content = infile.read()
+            except OSError:
+                # Removed or replaced since listed; look again at the next poll.
+                del stats[key]
+                continue
+            entry = dict(
+                digest=hashlib.blake2b(content, digest_size=16).hexdigest(),
+                parameters=self.parameters,
+                columns=_digests(filepath, names),
+            )
+            outfilepath = filepath.with_suffix(f".{self.format}")
+            if all(previous.get(k) == v for k, v in entry.items()):
+                # Unchanged; failed files are retried only when changed.
+                if previous["error"] or outfilepath.exists():
+                    continue
+            # Any error in a chart file is reported, and polling goes on.
+            try:
+                data = _chart.loads(content, format=_chart.get_format(filepath))
+                names = columns.references(data)
+                self.render(_chart.parse_document(data, filepath.parent), outfilepath)
+                error = None
+            except Exception as message:
+                error = str(message) or type(message).__name__
+            entry["columns"] = _digests(filepath, names)
+            self.manifest[key] = dict(error=bool(error), **entry)
+            rendered.append(filepath)
+            if callback:
+                callback(filepath, error)
+        removed = [k for k in self.manifest if not (self.dirpath / k).exists()]
+        for key in removed:
+            del self.manifest[key]
+        self.stats = stats
+        if rendered or removed:
+            self.write_manifest()
+        return rendered
+
+    def render(self, chart, outfilepath):
+        "Render the chart to the output file."
+        if self.format == "svg":
+            root = chart.svg()
+            with open(outfilepath, "w") as outfile:
+                root.write(outfile, indent=max(0, self.indent))
+        else:
+            chart.write_png(outfilepath, scale=self.scale)
+
+    def write_manifest(self):
+        "Write the manifest file into the directory."
+        with open(self.dirpath / self.MANIFEST, "w") as outfile:
+            json.dump(self.manifest, outfile, indent=1, sort_keys=True)
+
+
+def _stat(filepath):
+    "Return the modification time (ns) and size of the file, or None if missing."
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _digests(filepath, names):
+    """Return the content hashes of the external column files named relative
+    to the directory of the chart file; None for a missing file.
+    """
+    result = {}
+    for name in names:
+        try:
+            with open(filepath.parent / name, "rb") as infile:
+                digest = hashlib.blake2b(infile.read(), digest_size=16).hexdigest()
+        except OSError:
+            digest = None
+        result[name] = digest
+    return result